@@ -0,0 +1,370 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# INDICATORS & DATA SHAPING
+# ==========================================
+# Shared by the dashboards and the benchmark suite so both exercise the same code.
+
+SMA_WINDOW = 20
+
+def latest_option_snapshot(df):
+    """Keep only the latest snapshot for each contract symbol."""
+    if df.empty:
+        return df
+    return df.sort_values('Last_Updated').drop_duplicates(subset=['Contract_Symbol'], keep='last')
+
+# ==========================================
+# CROSS-ASSET RETURNS & CORRELATION
+# ==========================================
+
+def pivot_closes(df, freq='15min'):
+    """Wide Close matrix (Date x Ticker) on a shared bar grid, forward-filled.
+
+    ETL cycles re-append overlapping bars, so the newest load of each (Date, Ticker) wins.
+    Markets that are closed keep their last price, i.e. contribute a 0 return.
+    """
+    df = df.assign(Date=pd.to_datetime(df['Date']).dt.floor(freq))
+    if 'Last_Updated' in df.columns:
+        df = df.sort_values('Last_Updated')
+    df = df.drop_duplicates(subset=['Date', 'Ticker'], keep='last')
+    return df.pivot(index='Date', columns='Ticker', values='Close').sort_index().ffill()
+
+def returns_matrix(closes, previous=None):
+    """Simple returns as a float64 array; `previous` is the close row before `closes` (for increments)."""
+    values = closes.to_numpy(dtype=np.float64)
+    if previous is not None:
+        values = np.vstack([previous, values])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = values[1:] / values[:-1] - 1.0
+    # Tickers that have not started trading yet (NaN) or have no price change count as flat
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+class RollingMoments:
+    """Rolling covariance / correlation of the last `window` return rows.
+
+    Keeps the running sum and cross-product (X'X) of the window, so each new bar
+    costs one rank-1 update (O(N^2)) instead of recomputing the whole matrix.
+    Sums are rebuilt from the buffer every `window` pushes to stop float drift.
+    """
+
+    def __init__(self, window, tickers):
+        self.window = window
+        self.tickers = list(tickers)
+        n = len(self.tickers)
+        self.buffer = np.zeros((window, n))
+        self.count = 0
+        self.pos = 0
+        self.pushes_since_rebuild = 0
+        self.sum = np.zeros(n)
+        self.cross = np.zeros((n, n))
+
+    def extend(self, returns):
+        if len(returns) >= self.window:
+            # Bulk (re)load: only the last `window` rows matter, take them in one matmul
+            tail = returns[-self.window:]
+            self.buffer[:] = tail
+            self.count, self.pos = self.window, 0
+            self._rebuild()
+            return
+        for row in returns:
+            self.push(row)
+
+    def push(self, row):
+        if self.count == self.window:
+            old = self.buffer[self.pos]
+            self.sum -= old
+            self.cross -= np.outer(old, old)
+        else:
+            self.count += 1
+        self.buffer[self.pos] = row
+        self.sum += row
+        self.cross += np.outer(row, row)
+        self.pos = (self.pos + 1) % self.window
+
+        self.pushes_since_rebuild += 1
+        if self.pushes_since_rebuild >= self.window:
+            self._rebuild()
+
+    def pop(self, restore=None):
+        """Undo the newest push; `restore` is the row that push evicted (None if it evicted nothing)."""
+        self.pos = (self.pos - 1) % self.window
+        row = self.buffer[self.pos]
+        self.sum -= row
+        self.cross -= np.outer(row, row)
+        if restore is None:
+            self.buffer[self.pos] = 0.0
+            self.count -= 1
+        else:
+            # The evicted row was the oldest, which is the slot the next push overwrites
+            self.buffer[self.pos] = restore
+            self.sum += restore
+            self.cross += np.outer(restore, restore)
+
+    def _rebuild(self):
+        # The live rows are the `count` slots before `pos` (wrapping)
+        rows = self.buffer if self.count == self.window else \
+            self.buffer.take(range(self.pos - self.count, self.pos), axis=0, mode='wrap')
+        self.sum = rows.sum(axis=0)
+        self.cross = rows.T @ rows
+        self.pushes_since_rebuild = 0
+
+    def covariance(self):
+        n = self.count
+        if n < 2:
+            return np.full((len(self.tickers), len(self.tickers)), np.nan)
+        mean = self.sum / n
+        return (self.cross - n * np.outer(mean, mean)) / (n - 1)
+
+    def correlation(self):
+        cov = self.covariance()
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.outer(std, std)
+        # Flat series (e.g. a closed market over the whole window) have no defined correlation
+        flat = std < 1e-12
+        corr[flat, :] = np.nan
+        corr[:, flat] = np.nan
+        np.fill_diagonal(corr, 1.0)
+        return np.clip(corr, -1.0, 1.0)
+
+class CorrelationTracker:
+    """Incrementally maintained correlation state for one window size.
+
+    load() takes the full lookback once; update() then needs the bars from
+    `revise_from` on and returns False when unseen tickers appear (caller reloads).
+    The last REVISION_BARS bars are re-read every time, so an in-progress bar that
+    the ETL re-fetches, or a feed that lands late, replaces what was applied before.
+    """
+
+    REVISION_BARS = 4
+
+    def __init__(self, window):
+        self.window = window
+        self.moments = None
+        self.tickers = []
+        self.groups = []
+        # Close rows behind the window plus the revisable tail, enough to undo any revised return
+        self.closes = None
+
+    @property
+    def last_date(self):
+        return self.closes.index[-1]
+
+    @property
+    def revise_from(self):
+        # Never the first row: re-applied returns need the close before them
+        return self.closes.index[min(max(len(self.closes) - self.REVISION_BARS, 1), len(self.closes) - 1)]
+
+    def load(self, bars):
+        # Order by asset class so the heatmap shows blocks per class
+        classes = bars.drop_duplicates('Ticker').set_index('Ticker')['Asset_Type']
+        closes = pivot_closes(bars)
+        self.tickers = sorted(closes.columns, key=lambda t: (classes.get(t, ''), t))
+        self.groups = [classes.get(t, '') for t in self.tickers]
+        closes = closes[self.tickers]
+
+        self.moments = RollingMoments(self.window, self.tickers)
+        self.moments.extend(returns_matrix(closes))
+        self.closes = closes.iloc[-(self.window + 1 + self.REVISION_BARS):]
+
+    def update(self, bars):
+        if bars.empty:
+            return True
+        if not set(bars['Ticker']).issubset(self.tickers):
+            return False
+
+        fresh = pivot_closes(bars).reindex(columns=self.tickers)
+        fresh = fresh[fresh.index >= self.revise_from]
+        if fresh.empty:
+            return True
+
+        # Rows from the first re-read bar on are replaced; tickers without a bar there keep their last price
+        first = self.closes.index.searchsorted(fresh.index[0])
+        if first == 0:
+            return False
+        closes = pd.concat([self.closes.iloc[:first], fresh]).ffill()
+
+        # Undo the returns ending at the replaced rows, newest first, then apply the new ones
+        old_returns = returns_matrix(self.closes)
+        for row in range(len(self.closes) - 1, first - 1, -1):
+            evicted = row - self.window
+            self.moments.pop(old_returns[evicted - 1] if evicted >= 1 else None)
+        self.moments.extend(returns_matrix(closes.iloc[first:], previous=closes.iloc[first - 1].to_numpy()))
+        self.closes = closes.iloc[-(self.window + 1 + self.REVISION_BARS):]
+        return True
+
+    def snapshot(self):
+        """Plain values for display, so readers never touch the tracker while it is updated."""
+        return {
+            'correlation': self.moments.correlation(),
+            'covariance': self.moments.covariance(),
+            'tickers': list(self.tickers),
+            'groups': list(self.groups),
+            'count': self.moments.count,
+            'last_date': self.last_date,
+        }
+
+def top_pairs(corr, tickers, groups=None, n=10, cross_group_only=True):
+    """The `n` most strongly (anti-)correlated ticker pairs, optionally across asset classes only."""
+    i, j = np.triu_indices(len(tickers), k=1)
+    values = corr[i, j]
+    mask = ~np.isnan(values)
+    if groups is not None and cross_group_only:
+        groups = np.asarray(groups)
+        mask &= groups[i] != groups[j]
+    i, j, values = i[mask], j[mask], values[mask]
+    order = np.argsort(-np.abs(values))[:n]
+    tickers = np.asarray(tickers)
+    return pd.DataFrame({
+        'Ticker A': tickers[i[order]],
+        'Ticker B': tickers[j[order]],
+        'Correlation': values[order],
+    })
+
+# ==========================================
+# PER-TICKER SCREENER SUMMARY
+# ==========================================
+
+SUMMARY_COLUMNS = ['Ticker', 'Asset_Type', 'Last_Price', 'Day_Change_Pct', 'Week_Change_Pct',
+                   'Volatility_Pct', 'Volume', 'SMA_Distance_Pct', 'Last_Bar', 'Last_Updated']
+
+def _close_as_of(bars, last, offset):
+    """Close of each ticker at or before (its last bar - offset), else its first close."""
+    targets = last[['Ticker', 'Last_Bar']].assign(Target=last['Last_Bar'] - offset).sort_values('Target')
+    asof = pd.merge_asof(targets, bars[['Ticker', 'Date', 'Close']].sort_values('Date'),
+                         left_on='Target', right_on='Date', by='Ticker', direction='backward')
+    first = bars.groupby('Ticker')['Close'].first()
+    return asof.set_index('Ticker')['Close'].fillna(first).reindex(last['Ticker']).to_numpy()
+
+def summarize_tickers(bars, sma_window=SMA_WINDOW):
+    """One screener row per ticker from its recent bars (about a week is enough).
+
+    Changes are against the close one day / one week before the latest bar, volatility is the
+    standard deviation of bar returns over the last day, volume is the last day's total.
+    """
+    bars = bars.assign(Date=pd.to_datetime(bars['Date']))
+    if 'Last_Updated' in bars.columns:
+        bars = bars.sort_values('Last_Updated')
+    bars = bars.drop_duplicates(subset=['Ticker', 'Date'], keep='last').sort_values(['Ticker', 'Date'])
+
+    grouped = bars.groupby('Ticker', sort=True)
+    last = grouped.tail(1).rename(columns={'Date': 'Last_Bar', 'Close': 'Last_Price'}).reset_index(drop=True)
+    last_bar = bars['Ticker'].map(last.set_index('Ticker')['Last_Bar'])
+    in_last_day = bars['Date'] > last_bar - pd.Timedelta(days=1)
+
+    returns = grouped['Close'].pct_change()
+    sma = grouped['Close'].transform(lambda x: x.rolling(window=sma_window, min_periods=1).mean())
+    day = bars.assign(Return=returns)[in_last_day].groupby('Ticker')
+
+    price = last['Last_Price'].to_numpy()
+    summary = pd.DataFrame({
+        'Ticker': last['Ticker'],
+        'Asset_Type': last['Asset_Type'],
+        'Last_Price': price,
+        'Day_Change_Pct': (price / _close_as_of(bars, last, pd.Timedelta(days=1)) - 1) * 100,
+        'Week_Change_Pct': (price / _close_as_of(bars, last, pd.Timedelta(days=7)) - 1) * 100,
+        'Volatility_Pct': day['Return'].std().reindex(last['Ticker']).to_numpy() * 100,
+        'Volume': day['Volume'].sum().reindex(last['Ticker']).to_numpy(),
+        'SMA_Distance_Pct': (price / sma.groupby(bars['Ticker']).last().reindex(last['Ticker']).to_numpy() - 1) * 100,
+        'Last_Bar': last['Last_Bar'],
+    })
+    summary['Last_Updated'] = pd.Timestamp.now()
+    return summary[SUMMARY_COLUMNS]
+
+# ==========================================
+# OHLC ROLLUPS
+# ==========================================
+
+# Candidate buckets, finest first (15m is the stored bar size)
+ROLLUP_RULES = ['15min', '30min', '1h', '2h', '4h', '1D', '7D']
+
+def rollup_rule(dates, max_candles, rules=ROLLUP_RULES):
+    """Finest rule that rolls the bar times `dates` into at most `max_candles` buckets.
+
+    Counts the buckets that actually hold bars, so markets that close overnight get
+    finer candles than the wall-clock span alone would allow.
+    """
+    dates = pd.DatetimeIndex(pd.to_datetime(dates)).unique()
+    for rule in rules:
+        if dates.floor(rule).nunique() <= max_candles:
+            return rule
+    return rules[-1]
+
+def resample_ohlc(df, rule):
+    """Roll bars up into `rule` buckets per ticker (first Open, max High, min Low, last Close, summed Volume).
+
+    The newest load of a duplicated (Ticker, Date) bar is used; buckets are labelled by their start.
+    """
+    df = df.assign(Date=pd.to_datetime(df['Date']))
+    if 'Last_Updated' in df.columns:
+        df = df.sort_values('Last_Updated').drop_duplicates(subset=['Ticker', 'Date'], keep='last')
+    df = df.sort_values(['Ticker', 'Date']).assign(Bucket=lambda x: x['Date'].dt.floor(rule))
+
+    aggregations = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+    for extra, how in (('Asset_Type', 'last'), ('Last_Updated', 'max')):
+        if extra in df.columns:
+            aggregations[extra] = how
+    aggregations = {col: how for col, how in aggregations.items() if col in df.columns}
+
+    rolled = df.groupby(['Ticker', 'Bucket'], sort=True).agg(aggregations).reset_index()
+    return rolled.rename(columns={'Bucket': 'Date'})
+
+# ==========================================
+# OPTIONS HISTORY
+# ==========================================
+
+SNAPSHOT_KEYS = ['Last_Updated', 'Expiry']
+
+def whole_snapshots(chunks):
+    """Regroup row chunks ordered by Last_Updated so no snapshot is split across two of them."""
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            continue
+        # The last snapshot may continue in the next chunk: hold it back
+        tail = chunk['Last_Updated'] == chunk['Last_Updated'].iloc[-1]
+        carry = chunk[tail]
+        if not tail.all():
+            yield chunk[~tail]
+    if carry is not None and not carry.empty:
+        yield carry
+
+def option_snapshot_metrics(chain, wing=0.05):
+    """ATM strike, ATM IV and skew for every (Last_Updated, Expiry) snapshot in `chain`.
+
+    ATM is the strike where call and put prices are closest (by put-call parity C - P
+    crosses zero at the forward); ATM IV is the mean of its call and put IVs. Skew is
+    the IV of the put nearest (1 - wing) * ATM minus that of the call nearest (1 + wing) * ATM.
+    """
+    chain = chain.assign(Last_Updated=pd.to_datetime(chain['Last_Updated']),
+                         Strike=pd.to_numeric(chain['Strike'], errors='coerce'),
+                         Last_Price=pd.to_numeric(chain['Last_Price'], errors='coerce'),
+                         Implied_Volatility=pd.to_numeric(chain['Implied_Volatility'], errors='coerce'))
+    chain = chain.dropna(subset=['Strike', 'Last_Price', 'Implied_Volatility'])
+    calls = chain[chain['Type'] == 'Call']
+    puts = chain[chain['Type'] == 'Put']
+
+    pairs = calls.merge(puts, on=SNAPSHOT_KEYS + ['Strike'], suffixes=('_Call', '_Put'))
+    if pairs.empty:
+        return pd.DataFrame(columns=SNAPSHOT_KEYS + ['ATM_Strike', 'ATM_IV', 'Skew'])
+    pairs['Gap'] = (pairs['Last_Price_Call'] - pairs['Last_Price_Put']).abs()
+    atm = pairs.loc[pairs.groupby(SNAPSHOT_KEYS)['Gap'].idxmin()]
+    atm = pd.DataFrame({
+        'Last_Updated': atm['Last_Updated'].to_numpy(),
+        'Expiry': atm['Expiry'].to_numpy(),
+        'ATM_Strike': atm['Strike'].to_numpy(),
+        'ATM_IV': ((atm['Implied_Volatility_Call'] + atm['Implied_Volatility_Put']) / 2).to_numpy(),
+    })
+
+    def wing_iv(side, factor):
+        side = side.merge(atm[SNAPSHOT_KEYS + ['ATM_Strike']], on=SNAPSHOT_KEYS)
+        distance = (side['Strike'] - factor * side['ATM_Strike']).abs()
+        nearest = side.loc[distance.groupby([side['Last_Updated'], side['Expiry']]).idxmin()]
+        return nearest.set_index(SNAPSHOT_KEYS)['Implied_Volatility']
+
+    skew = wing_iv(puts, 1 - wing) - wing_iv(calls, 1 + wing)
+    atm = atm.set_index(SNAPSHOT_KEYS).assign(Skew=skew)
+    return atm.reset_index().sort_values(SNAPSHOT_KEYS, ignore_index=True)
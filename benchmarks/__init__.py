@@ -0,0 +1,4 @@
+"""Offline benchmarks for the Market Monitor hot paths.
+
+Run from the repository root:  python -m benchmarks.bench --help
+"""
@@ -0,0 +1,216 @@
+"""Benchmark the ETL, storage, query, indicator and chart-prep stages against SQLite.
+
+Every stage runs on deterministic synthetic data, so results are comparable
+between runs and machines. Example:
+
+    python -m benchmarks.bench --tickers 750 --bars 96 --repeat 3 --json baseline.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+# Allow `python benchmarks/bench.py` as well as `python -m benchmarks.bench`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import SMA_WINDOW, latest_option_snapshot  # noqa: E402
+from benchmarks import synthetic  # noqa: E402
+from charts import figure_from_json, group_slices, line_chart, relative_performance, rolling_mean  # noqa: E402
+from etl import transform_batch  # noqa: E402
+from etl2 import transform_chain  # noqa: E402
+
+# ==========================================
+# 1. MEASUREMENT
+# ==========================================
+
+def measure(name, fn, repeat=1):
+    """Run `fn` `repeat` times; fn returns the number of rows it processed.
+
+    Timed runs go without tracemalloc (it slows allocation-heavy code several
+    times over); one extra traced run records peak Python memory.
+    """
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = fn()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        'stage': name,
+        'rows': int(rows),
+        'best_s': best,
+        'mean_s': sum(timings) / len(timings),
+        'rows_per_s': rows / best if best > 0 else float('inf'),
+        'peak_mb': peak / 2**20,
+    }
+
+def print_report(results):
+    print(f"\n{'Stage':<22}{'Rows':>12}{'Best (s)':>12}{'Mean (s)':>12}{'Rows/s':>14}{'Peak MB':>10}")
+    print("-" * 82)
+    for r in results:
+        print(f"{r['stage']:<22}{r['rows']:>12,}{r['best_s']:>12.4f}{r['mean_s']:>12.4f}"
+              f"{r['rows_per_s']:>14,.0f}{r['peak_mb']:>10.1f}")
+
+# ==========================================
+# 2. STAGES
+# ==========================================
+
+def run(args):
+    assets = synthetic.make_asset_dict(args.tickers)
+    raw_batches = {
+        category: synthetic.generate_download(tickers, bars=args.bars, interval_minutes=args.interval,
+                                              seed=args.seed + i)
+        for i, (category, tickers) in enumerate(assets.items())
+    }
+    underlyings = synthetic.make_tickers(args.underlyings, prefix='OPT')
+    option_tickers = [synthetic.SyntheticTicker(u, expiries=args.expiries, strikes=args.strikes, seed=args.seed)
+                      for u in underlyings]
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='mm-bench-'), 'bench.db')
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    engine = create_engine(f"sqlite:///{db_path}")
+    print(f"Synthetic universe: {args.tickers} tickers x {args.bars} bars @ {args.interval}m, "
+          f"{args.underlyings} underlyings x {args.expiries} expiries x {args.strikes} strikes")
+    print(f"SQLite file: {db_path}")
+
+    results = []
+    state = {}
+
+    def ingest():
+        frames = []
+        for category, tickers in assets.items():
+            frames.extend(transform_batch(raw_batches[category], tickers, category))
+        state['market'] = pd.concat(frames)
+        return len(state['market'])
+    results.append(measure('ingest_transform', ingest, args.repeat))
+
+    def options_ingest():
+        frames = []
+        for tk in option_tickers:
+            for expiry in tk.options:
+                frames.append(transform_chain(tk.option_chain(expiry), tk.ticker, expiry))
+        state['options'] = pd.concat(frames)
+        return len(state['options'])
+    results.append(measure('options_transform', options_ingest, args.repeat))
+
+    def store_market():
+        state['market'].to_sql('MarketData', engine, if_exists='replace', index=False)
+        return len(state['market'])
+    results.append(measure('store_market', store_market, args.repeat))
+
+    option_history = synthetic.generate_option_history(underlyings, snapshots=args.snapshots,
+                                                       expiries=args.expiries, strikes=args.strikes,
+                                                       seed=args.seed)
+
+    def store_options():
+        option_history.to_sql('Options_Data', engine, if_exists='replace', index=False)
+        return len(option_history)
+    results.append(measure('store_options', store_options, args.repeat))
+
+    def query_market():
+        rows = 0
+        for category in assets:
+            query = f"SELECT * FROM MarketData WHERE Asset_Type = '{category}' ORDER BY Date ASC"
+            with engine.connect() as conn:
+                state[category] = pd.read_sql(query, conn)
+            rows += len(state[category])
+        return rows
+    results.append(measure('query_market', query_market, args.repeat))
+
+    def query_options():
+        rows = 0
+        for underlying in underlyings:
+            query = f"SELECT * FROM Options_Data WHERE Underlying_Ticker = '{underlying}' ORDER BY Last_Updated ASC"
+            with engine.connect() as conn:
+                df = pd.read_sql(query, conn)
+            rows += len(latest_option_snapshot(df))
+        return rows
+    results.append(measure('query_options_dedup', query_options, args.repeat))
+
+    first_category = next(iter(assets))
+    category_df = state[first_category]
+    chart_tickers = assets[first_category][:args.chart_tickers]
+    chart_df = category_df[category_df['Ticker'].isin(chart_tickers)]
+
+    def indicators():
+        # The per-ticker SMA and % performance series line_chart computes
+        opens = category_df['Open'].to_numpy(dtype=np.float64)
+        closes = category_df['Close'].to_numpy(dtype=np.float64)
+        rows_done = 0
+        for _, rows in group_slices(category_df, assets[first_category]):
+            rolling_mean(closes[rows], SMA_WINDOW)
+            relative_performance(closes[rows], opens[rows[0]])
+            rows_done += 2 * len(rows)
+        return rows_done
+    results.append(measure('indicators', indicators, args.repeat))
+
+    def options_dedup():
+        return len(latest_option_snapshot(option_history))
+    results.append(measure('options_dedup', options_dedup, args.repeat))
+
+    def chart_prep():
+        for normalize, show_sma in ((False, True), (True, False)):
+            fig = line_chart(chart_df, chart_tickers, normalize=normalize, show_sma=show_sma)
+            fig.to_json()
+        return len(chart_df) * 2
+    results.append(measure('chart_prep', chart_prep, args.repeat))
+
+    # Dashboard reruns with unchanged inputs rebuild the figure from its cached JSON
+    cached_json = [line_chart(chart_df, chart_tickers, normalize=n, show_sma=sma).to_json()
+                   for n, sma in ((False, True), (True, False))]
+
+    def chart_reuse():
+        for fig_json in cached_json:
+            figure_from_json(fig_json).to_json()
+        return len(chart_df) * 2
+    results.append(measure('chart_reuse', chart_reuse, args.repeat))
+
+    engine.dispose()
+    return results
+
+# ==========================================
+# 3. ENTRY POINT
+# ==========================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickers', type=int, default=75, help="Number of synthetic price tickers")
+    parser.add_argument('--bars', type=int, default=26, help="Bars of history per ticker")
+    parser.add_argument('--interval', type=int, default=15, help="Bar interval in minutes")
+    parser.add_argument('--underlyings', type=int, default=7, help="Number of optionable underlyings")
+    parser.add_argument('--expiries', type=int, default=4, help="Option expiries per underlying")
+    parser.add_argument('--strikes', type=int, default=40, help="Strikes per expiry (per side)")
+    parser.add_argument('--snapshots', type=int, default=48, help="Stored option snapshots per expiry")
+    parser.add_argument('--chart-tickers', type=int, default=3, help="Tickers drawn in the chart stage")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per stage; the best is reported")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', help="SQLite file to use (default: a fresh temp file)")
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run(args)
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Drive the request scheduler against the fake Yahoo transport.
+
+Reports symbols fetched per second, throttling and the dead-letter count, e.g.
+
+    python -m benchmarks.bench_scheduler --tickers 2000 --server-rate 5 --rate 4
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_transport import FakeYahooTransport  # noqa: E402
+from benchmarks.synthetic import make_tickers  # noqa: E402
+from scheduler import RequestScheduler  # noqa: E402
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickers', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=4.0, help="Client token bucket rate (requests/s)")
+    parser.add_argument('--burst', type=int, default=4)
+    parser.add_argument('--start-batch', type=int, default=25)
+    parser.add_argument('--max-batch', type=int, default=200)
+    parser.add_argument('--server-rate', type=float, default=5.0, help="Fake server's admitted requests/s")
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--drop-rate', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    transport = FakeYahooTransport(latency=args.latency, server_rate=args.server_rate,
+                                   drop_rate=args.drop_rate, error_rate=args.error_rate,
+                                   retry_after=1.0 / args.server_rate, seed=args.seed)
+    scheduler = RequestScheduler(transport, rate=args.rate, burst=args.burst,
+                                 start_batch=args.start_batch, max_batch=args.max_batch, backoff=0.5)
+
+    started = time.perf_counter()
+    fetched = 0
+    for batch, _ in scheduler.fetch(make_tickers(args.tickers), period="1d", interval="15m", group_by='ticker'):
+        fetched += len(batch)
+    elapsed = time.perf_counter() - started
+
+    dead = scheduler.drain_dead_letter()
+    print(f"Fetched {fetched:,}/{args.tickers:,} symbols in {elapsed:.2f}s ({fetched / elapsed:,.0f} symbols/s)")
+    print(f"Requests: {scheduler.stats['requests']}  429s: {scheduler.stats['rate_limited']}  "
+          f"errors: {scheduler.stats['errors']}  retried tickers: {scheduler.stats['retried']}")
+    print(f"Final batch size: {scheduler.batcher.size}  dead letters: {len(dead)}")
+
+if __name__ == "__main__":
+    main()
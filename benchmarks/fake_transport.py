@@ -0,0 +1,60 @@
+"""A local stand-in for the Yahoo endpoint that injects latency, throttling and gaps."""
+import random
+import time
+
+from benchmarks.synthetic import SyntheticDownloader
+from scheduler import RateLimitError
+
+class FakeYahooTransport:
+    """Serves synthetic batches like yf.download, with server-side misbehaviour.
+
+    - latency: base seconds per call plus `per_ticker` seconds per symbol
+    - server_rate / server_burst: a server-side token bucket; calls beyond it get a 429
+    - drop_rate: probability that a ticker comes back with no rows
+    - error_rate: probability that a whole call fails with a connection error
+    """
+
+    def __init__(self, latency=0.05, per_ticker=0.002, server_rate=5.0, server_burst=5,
+                 drop_rate=0.02, error_rate=0.01, retry_after=None, seed=0, sleep=time.sleep):
+        self.downloader = SyntheticDownloader(seed=seed)
+        self.latency = latency
+        self.per_ticker = per_ticker
+        self.server_rate = server_rate
+        self.server_burst = server_burst
+        self.drop_rate = drop_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.sleep = sleep
+        self.tokens = server_burst
+        self.updated = time.monotonic()
+        self.calls = 0
+        self.throttled = 0
+
+    def _admit(self):
+        now = time.monotonic()
+        self.tokens = min(self.server_burst, self.tokens + (now - self.updated) * self.server_rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def __call__(self, tickers, **kwargs):
+        self.calls += 1
+        if not self._admit():
+            self.throttled += 1
+            raise RateLimitError("429 Too Many Requests", retry_after=self.retry_after)
+
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        self.sleep(self.latency + self.per_ticker * len(tickers))
+        if self.random.random() < self.error_rate:
+            raise ConnectionError("Connection reset by peer")
+
+        raw_data = self.downloader(tickers, **kwargs)
+        dropped = [t for t in tickers if self.random.random() < self.drop_rate]
+        if dropped and len(tickers) > 1:
+            raw_data = raw_data.drop(columns=dropped, level=0)
+        elif dropped:
+            raw_data = raw_data.iloc[0:0]
+        return raw_data
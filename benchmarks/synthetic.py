@@ -0,0 +1,126 @@
+"""Deterministic synthetic market data shaped like the yfinance responses."""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+CATEGORIES = ['Stocks', 'Crypto', 'Indices', 'Currencies', 'Treasury']
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+DEFAULT_END = pd.Timestamp('2024-01-02 16:00', tz='America/New_York')
+
+OptionChain = namedtuple('OptionChain', ['calls', 'puts'])
+
+def make_tickers(n, prefix='SYN'):
+    return [f"{prefix}{i:05d}" for i in range(n)]
+
+def make_asset_dict(n_tickers, categories=CATEGORIES):
+    """Spread `n_tickers` synthetic symbols round-robin over the asset classes."""
+    assets = {category: [] for category in categories}
+    for i, ticker in enumerate(make_tickers(n_tickers)):
+        assets[categories[i % len(categories)]].append(ticker)
+    return {category: tickers for category, tickers in assets.items() if tickers}
+
+def generate_download(tickers, bars=26, interval_minutes=15, end=DEFAULT_END, seed=0):
+    """Return a frame shaped like yf.download(tickers, group_by='ticker').
+
+    Prices follow a seeded geometric random walk so repeated runs are identical.
+    """
+    n = len(tickers)
+    index = pd.date_range(end=end, periods=bars, freq=f"{interval_minutes}min", name='Datetime')
+    rng = np.random.default_rng(seed)
+
+    start = rng.uniform(10, 500, size=n)
+    close = start * np.exp(np.cumsum(rng.normal(0, 0.002, size=(bars, n)), axis=0))
+    open_ = np.vstack([start, close[:-1]])
+    spread = np.abs(rng.normal(0, 0.001, size=(bars, n))) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.integers(1_000, 1_000_000, size=(bars, n)).astype(float)
+
+    # (bars, tickers, fields) -> ticker-major columns, matching group_by='ticker'
+    values = np.stack([open_, high, low, close, volume], axis=2).reshape(bars, n * len(PRICE_FIELDS))
+    if n == 1:
+        return pd.DataFrame(values, index=index, columns=PRICE_FIELDS)
+    columns = pd.MultiIndex.from_product([tickers, PRICE_FIELDS], names=['Ticker', 'Price'])
+    return pd.DataFrame(values, index=index, columns=columns)
+
+def generate_expirations(n_expiries, start=DEFAULT_END):
+    """Weekly expiry dates as the YYYY-MM-DD strings yfinance returns."""
+    first_friday = start.normalize() + pd.offsets.Week(weekday=4)
+    return tuple((first_friday + pd.Timedelta(weeks=i)).strftime('%Y-%m-%d') for i in range(n_expiries))
+
+def generate_option_chain(ticker, expiry, strikes=40, spot=100.0, seed=0):
+    """Return an object with .calls/.puts frames like yf.Ticker(...).option_chain(expiry)."""
+    rng = np.random.default_rng(seed)
+    strike = np.round(np.linspace(spot * 0.7, spot * 1.3, strikes), 2)
+    moneyness = np.log(strike / spot)
+    code = pd.Timestamp(expiry).strftime('%y%m%d')
+
+    def side(kind, intrinsic):
+        iv = 0.25 + 0.8 * moneyness ** 2 + rng.normal(0, 0.01, size=strikes)
+        return pd.DataFrame({
+            'contractSymbol': [f"{ticker}{code}{kind}{int(k * 1000):08d}" for k in strike],
+            'lastTradeDate': pd.Timestamp(DEFAULT_END),
+            'strike': strike,
+            'lastPrice': np.round(intrinsic + spot * iv * 0.05, 2),
+            'bid': np.round(intrinsic + spot * iv * 0.045, 2),
+            'ask': np.round(intrinsic + spot * iv * 0.055, 2),
+            'volume': rng.integers(0, 5_000, size=strikes).astype(float),
+            'openInterest': rng.integers(0, 50_000, size=strikes),
+            'impliedVolatility': np.abs(iv),
+            'inTheMoney': intrinsic > 0,
+        })
+
+    return OptionChain(calls=side('C', np.maximum(spot - strike, 0)),
+                       puts=side('P', np.maximum(strike - spot, 0)))
+
+class SyntheticTicker:
+    """Stand-in for yf.Ticker exposing .options and .option_chain()."""
+
+    def __init__(self, ticker, expiries=4, strikes=40, seed=0):
+        self.ticker = ticker
+        self.strikes = strikes
+        self.seed = seed
+        self.options = generate_expirations(expiries)
+
+    def option_chain(self, date):
+        return generate_option_chain(self.ticker, date, strikes=self.strikes, seed=self.seed)
+
+def generate_option_history(underlyings, snapshots=48, expiries=4, strikes=40,
+                            snapshot_minutes=30, seed=0):
+    """Repeated option snapshots in the Options_Data layout (what the dashboard dedups)."""
+    frames = []
+    snapshot_times = pd.date_range(end=DEFAULT_END.tz_localize(None), periods=snapshots,
+                                   freq=f"{snapshot_minutes}min")
+    for u, underlying in enumerate(underlyings):
+        for expiry in generate_expirations(expiries):
+            for s, taken_at in enumerate(snapshot_times):
+                chain = generate_option_chain(underlying, expiry, strikes=strikes, seed=seed + u * 7919 + s)
+                df = pd.concat([chain.calls.assign(Type='Call'), chain.puts.assign(Type='Put')])
+                frames.append(pd.DataFrame({
+                    'Underlying_Ticker': underlying,
+                    'Contract_Symbol': df['contractSymbol'].values,
+                    'Type': df['Type'].values,
+                    'Strike': df['strike'].values,
+                    'Expiry': expiry,
+                    'Last_Price': df['lastPrice'].values,
+                    'Implied_Volatility': df['impliedVolatility'].values,
+                    'Last_Updated': taken_at.to_pydatetime(),
+                }))
+    return pd.concat(frames, ignore_index=True)
+
+class SyntheticDownloader:
+    """A drop-in for yf.download that serves generate_download() batches.
+
+    A class rather than a closure so it can be pickled into worker processes.
+    """
+
+    def __init__(self, bars=26, interval_minutes=15, seed=0):
+        self.bars = bars
+        self.interval_minutes = interval_minutes
+        self.seed = seed
+
+    def __call__(self, tickers, **kwargs):
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        batch_seed = self.seed + sum(map(ord, ''.join(tickers))) % 10_000
+        return generate_download(tickers, bars=self.bars, interval_minutes=self.interval_minutes, seed=batch_seed)
@@ -0,0 +1,76 @@
+import hashlib
+import os
+import pickle
+import time
+
+# ==========================================
+# ON-DISK RESPONSE CACHE
+# ==========================================
+# For slow-changing lookups (option expiration lists, ticker metadata) that we
+# would otherwise re-request from Yahoo every cycle. One pickle file per key;
+# entries expire after a per-lookup TTL and the least recently used files are
+# evicted once the cache exceeds `max_entries` or `max_bytes`.
+
+CACHE_DIR = os.environ.get(
+    'MARKET_MONITOR_CACHE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'),
+)
+
+class DiskCache:
+    def __init__(self, directory=CACHE_DIR, max_entries=4096, max_bytes=64 * 2**20):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.pkl')
+
+    def get(self, key, ttl, default=None):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                stored_at, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return default
+
+        if time.time() - stored_at > ttl:
+            return default
+
+        # Touch the file so eviction sees it as recently used
+        os.utime(path)
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((time.time(), value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        # Atomic swap so a concurrent reader never sees a half-written entry
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if len(entries) <= self.max_entries and total <= self.max_bytes:
+            return
+
+        # Oldest access time first
+        entries.sort()
+        remaining = len(entries)
+        for _, size, path in entries:
+            if remaining <= self.max_entries and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            remaining -= 1
+            total -= size
@@ -0,0 +1,145 @@
+import math
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
+
+from analytics import SMA_WINDOW, resample_ohlc, rollup_rule
+
+# ==========================================
+# FIGURE BUILDERS
+# ==========================================
+# Traces are built straight from NumPy arrays (one slice per ticker) instead of
+# handing long-format DataFrames to plotly.express, which re-groups and copies
+# the frame for every figure.
+
+COLORS = px.colors.qualitative.Plotly
+
+def group_slices(df, keys, by='Ticker'):
+    """(key, row positions) for each of `keys` that has rows in df[by], in that order."""
+    positions = df.groupby(by, sort=False).indices
+    return [(k, positions[k]) for k in keys if k in positions]
+
+def rolling_mean(values, window):
+    """Trailing mean, NaN until the window is full (same as pandas rolling(window).mean())."""
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = np.lib.stride_tricks.sliding_window_view(values, window).mean(axis=1)
+    return out
+
+def relative_performance(closes, first_open):
+    """% move of `closes` from the first Open of the range."""
+    return (closes - first_open) / first_open * 100
+
+def line_chart(filtered_df, selected_tickers, normalize=False, show_sma=False):
+    """Overlaid price (or % performance) lines, optionally with SMA traces."""
+    dates = filtered_df['Date'].to_numpy()
+    opens = filtered_df['Open'].to_numpy(dtype=np.float64)
+    closes = filtered_df['Close'].to_numpy(dtype=np.float64)
+    slices = group_slices(filtered_df, selected_tickers)
+
+    fig = go.Figure()
+    for i, (ticker, rows) in enumerate(slices):
+        y = closes[rows]
+        if normalize:
+            y = relative_performance(y, opens[rows[0]])
+        fig.add_trace(go.Scatter(x=dates[rows], y=y, mode='lines', name=ticker, legendgroup=ticker,
+                                 line=dict(color=COLORS[i % len(COLORS)])))
+
+    if show_sma and not normalize:
+        for ticker, rows in slices:
+            fig.add_trace(go.Scatter(x=dates[rows], y=rolling_mean(closes[rows], SMA_WINDOW), mode='lines',
+                                     name=f"{ticker} SMA", line=dict(width=1, dash='dot'), opacity=0.7))
+
+    fig.update_layout(height=500, hovermode="x unified", template="plotly_dark", legend_title_text='Ticker',
+                      xaxis_title='Date', yaxis_title='Rel_Performance' if normalize else 'Close')
+    return fig
+
+def candlestick_chart(candle_data, ticker):
+    fig = go.Figure(data=[go.Candlestick(x=candle_data['Date'].to_numpy(), open=candle_data['Open'].to_numpy(),
+                                         high=candle_data['High'].to_numpy(), low=candle_data['Low'].to_numpy(),
+                                         close=candle_data['Close'].to_numpy())])
+    fig.update_layout(title=f"{ticker} Price Action", height=500, template="plotly_dark", xaxis_rangeslider_visible=False)
+    return fig
+
+# Candles per small-multiple panel: readable at panel size and light with 10+ panels
+GRID_CANDLES = 150
+
+def candlestick_grid(df, tickers, max_candles=GRID_CANDLES):
+    """One candlestick panel per ticker in a single figure, rolled up to at most ~`max_candles` per panel."""
+    bars = df[df['Ticker'].isin(tickers)]
+    rule = rollup_rule(bars['Date'], max_candles)
+    bars = resample_ohlc(bars, rule)
+    slices = group_slices(bars, tickers)
+    if not slices:
+        return go.Figure().update_layout(template="plotly_dark")
+
+    cols = 2 if len(slices) <= 4 else 3
+    rows = math.ceil(len(slices) / cols)
+    fig = make_subplots(rows=rows, cols=cols, subplot_titles=[t for t, _ in slices],
+                        horizontal_spacing=0.05, vertical_spacing=min(0.08, 0.3 / rows))
+
+    dates = bars['Date'].to_numpy()
+    ohlc = {c: bars[c].to_numpy(dtype=np.float64) for c in ('Open', 'High', 'Low', 'Close')}
+    for i, (ticker, positions) in enumerate(slices):
+        fig.add_trace(go.Candlestick(x=dates[positions], open=ohlc['Open'][positions], high=ohlc['High'][positions],
+                                     low=ohlc['Low'][positions], close=ohlc['Close'][positions],
+                                     name=ticker, showlegend=False),
+                      row=i // cols + 1, col=i % cols + 1)
+
+    fig.update_xaxes(rangeslider_visible=False)
+    fig.update_layout(title=f"Price Action ({rule} candles)", height=max(500, 260 * rows), template="plotly_dark")
+    return fig
+
+SMILE_COLORS = {'Call': '#00CC96', 'Put': '#EF553B'}
+
+def volatility_smile(df_opt, ticker):
+    """IV vs strike, one marker trace per option type."""
+    fig = go.Figure()
+    for option_type, rows in group_slices(df_opt, list(SMILE_COLORS), by='Type'):
+        part = df_opt.iloc[rows]
+        fig.add_trace(go.Scatter(
+            x=part['Strike'].to_numpy(), y=part['Implied_Volatility'].to_numpy(), mode='markers', name=option_type,
+            marker=dict(color=SMILE_COLORS[option_type], size=8, opacity=0.7),
+            customdata=np.column_stack([part['Last_Price'].to_numpy(), part['Contract_Symbol'].to_numpy()]),
+            hovertemplate="Strike=%{x}<br>IV=%{y}<br>Last_Price=%{customdata[0]}<br>%{customdata[1]}<extra></extra>",
+        ))
+    fig.update_layout(title=f"{ticker} Implied Volatility", template="plotly_dark", height=400,
+                      legend_title_text='Type', xaxis_title='Strike', yaxis_title='Implied_Volatility')
+    return fig
+
+def options_history_chart(history, ticker):
+    """ATM IV (top) and skew (bottom) over time, one line per expiry."""
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+                        subplot_titles=["ATM Implied Volatility", "Skew (95% put IV - 105% call IV)"])
+    dates = history['Last_Updated'].to_numpy()
+    atm_iv = history['ATM_IV'].to_numpy(dtype=np.float64)
+    skew = history['Skew'].to_numpy(dtype=np.float64)
+    for i, (expiry, rows) in enumerate(group_slices(history, sorted(history['Expiry'].unique()), by='Expiry')):
+        color = COLORS[i % len(COLORS)]
+        fig.add_trace(go.Scatter(x=dates[rows], y=atm_iv[rows], mode='lines', name=str(expiry), legendgroup=str(expiry),
+                                 line=dict(color=color)), row=1, col=1)
+        fig.add_trace(go.Scatter(x=dates[rows], y=skew[rows], mode='lines', name=str(expiry), legendgroup=str(expiry),
+                                 line=dict(color=color), showlegend=False), row=2, col=1)
+    fig.update_layout(title=f"{ticker} Volatility History", height=600, hovermode="x unified",
+                      template="plotly_dark", legend_title_text='Expiry')
+    return fig
+
+def contract_history_chart(contract_df, symbol):
+    """Last price and implied volatility of one contract across snapshots."""
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    dates = contract_df['Last_Updated'].to_numpy()
+    fig.add_trace(go.Scatter(x=dates, y=contract_df['Last_Price'].to_numpy(dtype=np.float64), mode='lines',
+                             name='Last_Price'), secondary_y=False)
+    fig.add_trace(go.Scatter(x=dates, y=contract_df['Implied_Volatility'].to_numpy(dtype=np.float64), mode='lines',
+                             name='Implied_Volatility', line=dict(dash='dot')), secondary_y=True)
+    fig.update_yaxes(title_text='Last_Price', secondary_y=False)
+    fig.update_yaxes(title_text='Implied_Volatility', secondary_y=True)
+    fig.update_layout(title=f"{symbol} History", height=400, hovermode="x unified", template="plotly_dark")
+    return fig
+
+def figure_from_json(fig_json):
+    """Rebuild a figure cached with fig.to_json() (cheap next to building it from data)."""
+    return pio.from_json(fig_json, skip_invalid=True)
@@ -1,18 +1,36 @@
 import streamlit as st
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import asc, column, create_engine, desc, inspect, or_, select, table, text
 import urllib.parse
 import plotly.express as px
-import plotly.graph_objects as go
 import time
 import os
 import sqlite3
+import threading
+
+from analytics import (SUMMARY_COLUMNS, CorrelationTracker, latest_option_snapshot, option_snapshot_metrics,
+                       summarize_tickers, top_pairs, whole_snapshots)
+from charts import (candlestick_chart, candlestick_grid, contract_history_chart, figure_from_json, line_chart,
+                    options_history_chart, volatility_smile)
+from notifications import current_versions
+from profiling import RerunProfiler, enabled_by_env
 
 # ==========================================
 # 1. SETUP & HYBRID CONNECTION
 # ==========================================
 st.set_page_config(page_title="Market Terminal", layout="wide", page_icon="💹")
 
+# Opt-in rerun profiling (MARKET_MONITOR_PROFILE=1 or the sidebar toggle drawn at the bottom;
+# widget values are already in session_state here, so the whole rerun is covered)
+stale_profiler = st.session_state.pop('profiler', None)
+if stale_profiler is not None:
+    # The previous rerun was interrupted before it could report
+    stale_profiler.close()
+profiler = RerunProfiler(enabled=st.session_state.get('profiling', enabled_by_env()),
+                         trace_memory=st.session_state.get('profile_memory', True),
+                         cprofile=st.session_state.get('profile_dump', False))
+st.session_state['profiler'] = profiler
+
 @st.cache_resource
 def get_connection():
     # STRATEGY: Try SQL Server (Local Live) first. If it fails, use SQLite (Cloud Demo).
@@ -42,7 +60,8 @@ def get_connection():
         else:
             return None, "No Database Found"
 
-engine, db_source = get_connection()
+with profiler.stage("connect"):
+    engine, db_source = get_connection()
 
 # Show connection status in sidebar
 if engine:
@@ -57,38 +76,329 @@ else:
 # ==========================================
 # 2. HELPER FUNCTIONS
 # ==========================================
-def load_market_data(asset_type):
+# The ETL workers bump a version per asset class / underlying after each load
+# (notifications.py). Loaders take that version as a cache key, so reruns from
+# widget changes reuse cached frames until the data actually changes. The TTL
+# only matters for writers that do not publish versions.
+DATA_TTL = 300
+POLL_SECONDS = 15
+
+# Read before any data, so a load that lands mid-run is still seen as new
+with profiler.stage("data versions") as stage:
+    data_versions = current_versions(engine) if engine else {}
+    stage.rows = len(data_versions)
+
+def version_of(channel):
+    return data_versions.get(channel, 0)
+
+TIME_RANGES = {
+    '1D': pd.Timedelta(days=1),
+    '5D': pd.Timedelta(days=5),
+    '1M': pd.Timedelta(days=30),
+    'All': None,
+}
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def distinct_values(table_name, column_name, version):
+    """Rarely-changing lookup lists (asset classes, underlyings), refreshed when the ETL publishes."""
+    return pd.read_sql(f"SELECT DISTINCT {column_name} FROM {table_name}", engine)[column_name].tolist()
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def has_table(table_name, version):
+    return inspect(engine).has_table(table_name)
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def latest_bar(asset_type, version):
+    query = text("SELECT MAX(Date) AS Latest FROM MarketData WHERE Asset_Type = :asset_type")
+    return pd.read_sql(query, engine, params={'asset_type': asset_type})['Latest'].iloc[0]
+
+def range_start(asset_type, time_range):
+    """Start of the selected window, measured back from the newest bar of the asset class."""
+    span = TIME_RANGES[time_range]
+    if span is None or not engine:
+        return None
+    latest = latest_bar(asset_type, version_of(f"market:{asset_type}"))
+    if latest is None:
+        return None
+    # Whole seconds bind the same way the stored dates compare in both SQL Server and SQLite
+    return (pd.to_datetime(latest) - span).to_pydatetime().replace(microsecond=0)
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def query_market_data(asset_type, start, version):
+    query = "SELECT * FROM MarketData WHERE Asset_Type = :asset_type"
+    params = {'asset_type': asset_type}
+    if start is not None:
+        query += " AND Date >= :start"
+        params['start'] = start
+    with engine.connect() as conn:
+        return pd.read_sql(text(query + " ORDER BY Date ASC"), conn, params=params)
+
+def load_market_data(asset_type, start=None):
     if not engine: return pd.DataFrame()
-    query = f"SELECT * FROM MarketData WHERE Asset_Type = '{asset_type}' ORDER BY Date ASC"
     try:
-        with engine.connect() as conn:
-            df = pd.read_sql(query, conn)
-        return df
+        return query_market_data(asset_type, start, version_of(f"market:{asset_type}"))
     except Exception as e:
         st.error(f"Query Error: {e}")
         return pd.DataFrame()
 
+@st.cache_data(ttl=DATA_TTL, max_entries=64, show_spinner=False)
+def price_chart_json(chart_type, asset_type, start, tickers, normalize, show_sma, version):
+    """Serialized figure per (view, settings, data version): other widget changes reuse it as-is."""
+    df = query_market_data(asset_type, start, version)
+    if chart_type == "Line":
+        fig = line_chart(df[df['Ticker'].isin(tickers)], list(tickers), normalize=normalize, show_sma=show_sma)
+    elif len(tickers) == 1:
+        fig = candlestick_chart(df[df['Ticker'] == tickers[0]], tickers[0])
+    else:
+        fig = candlestick_grid(df, list(tickers))
+    return fig.to_json()
+
+def price_chart(chart_type, asset_type, start, tickers, normalize=False, show_sma=False):
+    # Settings that do not affect a chart type are dropped from its cache key
+    if chart_type != "Line":
+        normalize, show_sma = False, False
+    elif normalize:
+        show_sma = False
+    fig_json = price_chart_json(chart_type, asset_type, start, tuple(tickers), normalize, show_sma,
+                                version_of(f"market:{asset_type}"))
+    return figure_from_json(fig_json)
+
+MARKET_TABLE = table('MarketData', *[column(c) for c in
+                                     ['Ticker', 'Asset_Type', 'Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'Last_Updated']])
+
+def load_grid_page(tickers, start, cursor, page_size):
+    """One page of rows ordered (Date, Ticker, Last_Updated) descending, continuing after `cursor`.
+
+    Keyset pagination: the cursor is the (Date, Ticker, Last_Updated) of the previous
+    page's last row. Each ticker is one backward walk of IX_MarketData_Ticker_Date_Updated
+    that stops after `page_size + 1` rows, and the walks are merged here, so a page reads
+    at most len(tickers) * (page_size + 1) rows however deep it is. (A single IN (...)
+    query cannot do that: the planner seeks the ticker index and sorts every matching row.)
+    Last_Updated makes the key unique: every ETL cycle re-appends the same (Date, Ticker)
+    bars. Returns (page, has_more).
+    """
+    t = MARKET_TABLE
+    key = ['Date', 'Ticker', 'Last_Updated']
+    parts = []
+    with engine.connect() as conn:
+        for ticker in tickers:
+            query = select(t.c.Date, t.c.Ticker, t.c.Open, t.c.High, t.c.Low, t.c.Close, t.c.Volume, t.c.Last_Updated)
+            query = query.where(t.c.Ticker == ticker)
+            if start is not None:
+                query = query.where(t.c.Date >= start)
+            if cursor is not None:
+                # Tickers are compared here, so the order does not depend on the server collation
+                cursor_date, cursor_ticker, cursor_updated = cursor
+                if ticker < cursor_ticker:
+                    query = query.where(t.c.Date <= cursor_date)
+                elif ticker > cursor_ticker:
+                    query = query.where(t.c.Date < cursor_date)
+                else:
+                    # The redundant Date bound keeps the walk a range seek next to the OR
+                    query = query.where(t.c.Date <= cursor_date,
+                                        or_(t.c.Date < cursor_date, t.c.Last_Updated < cursor_updated))
+            query = query.order_by(desc(t.c.Date), desc(t.c.Last_Updated)).limit(page_size + 1)
+            parts.append(pd.read_sql(query, conn))
+
+    if not parts:
+        return pd.DataFrame(columns=key), False
+    page = pd.concat(parts, ignore_index=True).sort_values(key, ascending=False)
+    return page.head(page_size), len(page) > page_size
+
+def render_data_grid(tickers, start):
+    page_size = st.select_slider("Rows per page", options=[50, 100, 250, 500], value=100, key='grid_page_size')
+
+    # Restart from the first page whenever the filters change
+    grid = st.session_state.setdefault('grid', {})
+    grid_key = (tuple(tickers), start, page_size)
+    if grid.get('key') != grid_key:
+        grid.update(key=grid_key, cursors=[None])
+    cursors = grid['cursors']
+
+    page, has_more = load_grid_page(tickers, start, cursors[-1], page_size)
+    st.dataframe(page.assign(Date=pd.to_datetime(page['Date'])), use_container_width=True, hide_index=True)
+
+    c1, c2, c3 = st.columns([1, 1, 4])
+    if c1.button("◀ Newer", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if c2.button("Older ▶", disabled=not has_more):
+        # Keep the raw driver values so the next comparison matches the stored format exactly
+        last = page.iloc[-1]
+        last_date, last_updated = (v.to_pydatetime() if isinstance(v, pd.Timestamp) else v
+                                   for v in (last['Date'], last['Last_Updated']))
+        cursors.append((last_date, last['Ticker'], last_updated))
+        st.rerun()
+    c3.caption(f"Page {len(cursors)}")
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def query_options_data(ticker, version):
+    query = text("SELECT * FROM Options_Data WHERE Underlying_Ticker = :ticker ORDER BY Last_Updated ASC")
+    with engine.connect() as conn:
+        df = pd.read_sql(query, conn, params={'ticker': ticker})
+    # Keep only the latest snapshot for each contract symbol
+    return latest_option_snapshot(df)
+
+@st.cache_data(ttl=DATA_TTL, max_entries=64, show_spinner=False)
+def smile_chart_json(ticker, version):
+    df_opt = query_options_data(ticker, version)
+    df_opt = df_opt.assign(Strike=pd.to_numeric(df_opt['Strike'], errors='coerce'),
+                           Implied_Volatility=pd.to_numeric(df_opt['Implied_Volatility'], errors='coerce'))
+    return volatility_smile(df_opt, ticker).to_json()
+
 def load_options_data(ticker):
     if not engine: return pd.DataFrame()
-    query = f"SELECT * FROM Options_Data WHERE Underlying_Ticker = '{ticker}' ORDER BY Last_Updated ASC"
     try:
-        with engine.connect() as conn:
-            df = pd.read_sql(query, conn)
-        if not df.empty:
-            # Keep only the latest snapshot for each contract symbol
-            df = df.sort_values('Last_Updated').drop_duplicates(subset=['Contract_Symbol'], keep='last')
-        return df
+        return query_options_data(ticker, version_of(f"options:{ticker}"))
     except Exception as e:
         # Non-fatal error (table might not exist in snapshot if empty)
         return pd.DataFrame()
 
+# Rows per read while scanning option history; bounds memory for months of snapshots
+OPTIONS_CHUNK_ROWS = 50_000
+
+@st.cache_resource
+def options_history_state(ticker, lookback_days):
+    # Per-snapshot metrics shared by all sessions; each snapshot is reduced once, later runs read only newer ones
+    return {'history': None, 'last': None, 'version': None, 'lock': threading.Lock()}
+
+def options_history(ticker, lookback_days):
+    """ATM IV / skew per (snapshot, expiry) over the lookback, maintained incrementally."""
+    holder = options_history_state(ticker, lookback_days)
+    version = version_of(f"options:{ticker}")
+    with holder['lock']:
+        if holder['history'] is not None and version and holder['version'] == version:
+            return holder['history']
+
+        query = ("SELECT Contract_Symbol, Type, Strike, Expiry, Last_Price, Implied_Volatility, Last_Updated "
+                 "FROM Options_Data WHERE Underlying_Ticker = :ticker AND Last_Updated {op} :after ORDER BY Last_Updated")
+        if holder['last'] is None:
+            latest = pd.read_sql(text("SELECT MAX(Last_Updated) AS Latest FROM Options_Data WHERE Underlying_Ticker = :ticker"),
+                                 engine, params={'ticker': ticker})['Latest'].iloc[0]
+            if latest is None:
+                return pd.DataFrame()
+            after = (pd.to_datetime(latest) - pd.Timedelta(days=lookback_days)).to_pydatetime().replace(microsecond=0)
+            query = query.format(op='>=')
+        else:
+            # Raw driver value, so the comparison matches the stored format exactly
+            after = holder['last']
+            query = query.format(op='>')
+
+        frames = [] if holder['history'] is None else [holder['history']]
+        with engine.connect() as conn:
+            chunks = pd.read_sql(text(query), conn, params={'ticker': ticker, 'after': after}, chunksize=OPTIONS_CHUNK_ROWS)
+            for snapshots in whole_snapshots(chunks):
+                holder['last'] = snapshots['Last_Updated'].iloc[-1]
+                frames.append(option_snapshot_metrics(snapshots))
+
+        history = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        # Drop what has aged out of the lookback
+        if not history.empty:
+            history = history[history['Last_Updated'] >= history['Last_Updated'].max() - pd.Timedelta(days=lookback_days)]
+        holder.update(history=history.reset_index(drop=True), version=version)
+        return holder['history']
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def latest_contracts(ticker, version):
+    """Contracts of the newest snapshot only, for the contract picker."""
+    query = text("SELECT Contract_Symbol, Type, Strike FROM Options_Data WHERE Underlying_Ticker = :ticker "
+                 "AND Last_Updated = (SELECT MAX(Last_Updated) FROM Options_Data WHERE Underlying_Ticker = :ticker)")
+    chain = pd.read_sql(query, engine, params={'ticker': ticker})
+    return chain.assign(Strike=pd.to_numeric(chain['Strike'], errors='coerce')).sort_values(['Type', 'Strike'])
+
+@st.cache_data(ttl=DATA_TTL, max_entries=64, show_spinner=False)
+def contract_history(ticker, symbol, lookback_days, version):
+    """Price / IV of one contract across snapshots: an index seek on (Underlying, Contract, Last_Updated)."""
+    latest = pd.read_sql(text("SELECT MAX(Last_Updated) AS Latest FROM Options_Data "
+                              "WHERE Underlying_Ticker = :ticker AND Contract_Symbol = :symbol"),
+                         engine, params={'ticker': ticker, 'symbol': symbol})['Latest'].iloc[0]
+    if latest is None:
+        return pd.DataFrame()
+    start = (pd.to_datetime(latest) - pd.Timedelta(days=lookback_days)).to_pydatetime().replace(microsecond=0)
+    query = text("SELECT Last_Updated, Strike, Expiry, Last_Price, Implied_Volatility FROM Options_Data "
+                 "WHERE Underlying_Ticker = :ticker AND Contract_Symbol = :symbol AND Last_Updated >= :start "
+                 "ORDER BY Last_Updated")
+    return pd.read_sql(query, engine, params={'ticker': ticker, 'symbol': symbol, 'start': start},
+                       parse_dates=['Last_Updated'])
+
+def load_bars_since(start):
+    """Close bars for every instrument from `start` (inclusive) on - the correlation input."""
+    query = text("SELECT Date, Ticker, Asset_Type, Close, Last_Updated FROM MarketData WHERE Date >= :start")
+    with engine.connect() as conn:
+        return pd.read_sql(query, conn, params={'start': start}, parse_dates=['Date', 'Last_Updated'])
+
+@st.cache_resource
+def correlation_tracker(window, lookback_days):
+    # One tracker per (window, lookback) shared by all sessions; the lock serializes updates
+    return {'tracker': None, 'snapshot': None, 'version': None, 'lock': threading.Lock()}
+
+def current_correlation(window, lookback_days):
+    """Snapshot of the shared tracker, taken under its lock (sessions only ever read the snapshot)."""
+    holder = correlation_tracker(window, lookback_days)
+    version = version_of('market')
+    with holder['lock']:
+        tracker = holder['tracker']
+        if tracker is not None:
+            # Nothing published since the last update: skip the query entirely
+            if version and holder['version'] == version:
+                return holder['snapshot']
+            # Re-read the last few bars too: the newest one is revised while in progress, feeds land late
+            new_bars = load_bars_since(tracker.revise_from.to_pydatetime())
+            if tracker.update(new_bars):
+                holder.update(snapshot=tracker.snapshot(), version=version)
+                return holder['snapshot']
+
+        # First use, or new tickers appeared: rebuild from the lookback period
+        latest = pd.read_sql("SELECT MAX(Date) AS Latest FROM MarketData", engine)['Latest'].iloc[0]
+        if latest is None:
+            return None
+        start = pd.to_datetime(latest) - pd.Timedelta(days=lookback_days)
+        bars = load_bars_since(start.to_pydatetime())
+        if bars.empty:
+            return None
+        tracker = CorrelationTracker(window)
+        tracker.load(bars)
+        holder.update(tracker=tracker, snapshot=tracker.snapshot(), version=version)
+        return holder['snapshot']
+
+SUMMARY_TABLE = table('Ticker_Summary', *[column(c) for c in SUMMARY_COLUMNS])
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def load_screener(asset_types, sort_by, descending, limit, min_volume=0, version=0):
+    """Sorted, filtered page of the per-ticker summary table maintained by etl.py."""
+    t = SUMMARY_TABLE
+    query = select(t).order_by(desc(t.c[sort_by]) if descending else asc(t.c[sort_by])).limit(limit)
+    if asset_types:
+        query = query.where(t.c.Asset_Type.in_(asset_types))
+    if min_volume:
+        query = query.where(t.c.Volume >= min_volume)
+    with engine.connect() as conn:
+        return pd.read_sql(query, conn)
+
+@st.cache_data(ttl=600)
+def snapshot_summary():
+    # Snapshot databases predate Ticker_Summary: derive it once from the last week of bars
+    latest = pd.read_sql("SELECT MAX(Date) AS Latest FROM MarketData", engine)['Latest'].iloc[0]
+    start = pd.to_datetime(latest) - pd.Timedelta(days=8)
+    bars = pd.read_sql(text("SELECT Ticker, Asset_Type, Date, Close, Volume, Last_Updated FROM MarketData WHERE Date >= :start"),
+                       engine, params={'start': start.to_pydatetime()})
+    return summarize_tickers(bars)
+
 # ==========================================
 # 3. SIDEBAR CONTROLS
 # ==========================================
 st.sidebar.header("🕹️ Control Panel")
 
 # --- MODE SELECTOR ---
-dashboard_mode = st.sidebar.radio("Dashboard Mode", ["Live Market", "Options Chain"], index=0)
+dashboard_mode = st.sidebar.radio("Dashboard Mode", ["Live Market", "Options Chain", "Options History", "Correlation Matrix", "Screener"], index=0)
+
+# Logic: Only allow live updates if connected to Live SQL Server
+if "SQL Server" in db_source:
+    live_updates = st.sidebar.checkbox("🔴 Live Updates", help="Reload as soon as the ETL loads new data for this view")
+else:
+    live_updates = False
+# Notification channels the current view depends on (see notifications.py)
+watched = []
 st.sidebar.markdown("---")
 
 # ==========================================
@@ -98,8 +408,9 @@ if dashboard_mode == "Live Market":
     
     if engine:
         try:
-            asset_types = pd.read_sql("SELECT DISTINCT Asset_Type FROM MarketData", engine)
-            asset_list = asset_types['Asset_Type'].tolist()
+            with profiler.stage("asset classes (DISTINCT)") as stage:
+                asset_list = distinct_values('MarketData', 'Asset_Type', version_of('market'))
+                stage.rows = len(asset_list)
         except:
             asset_list = []
     else:
@@ -110,7 +421,13 @@ if dashboard_mode == "Live Market":
             st.warning("Database connected but empty. Run your ETL script!")
     else:
         selected_asset = st.sidebar.selectbox("Asset Class", asset_list, index=0)
-        df = load_market_data(selected_asset)
+        time_range = st.sidebar.radio("Time Range", list(TIME_RANGES), index=1, horizontal=True)
+        with profiler.stage("range start"):
+            range_from = range_start(selected_asset, time_range)
+        with profiler.stage("load_market_data") as stage:
+            df = load_market_data(selected_asset, range_from)
+            stage.rows = len(df)
+        watched = [f"market:{selected_asset}"]
 
         if not df.empty:
             all_tickers = df['Ticker'].unique().tolist()
@@ -130,13 +447,6 @@ if dashboard_mode == "Live Market":
                 if not normalize:
                     show_sma = st.sidebar.checkbox("Show SMA (20)", value=True, help="Show 20-period Simple Moving Average")
 
-            st.sidebar.markdown("---")
-            
-            # Logic: Only allow auto-refresh if connected to Live SQL Server
-            if "SQL Server" in db_source:
-                auto_refresh = st.sidebar.checkbox("🔴 Live Auto-Refresh (15s)")
-            else:
-                auto_refresh = False 
 
             # --- DASHBOARD UI ---
             st.title(f"💹 {selected_asset} Live Terminal")
@@ -145,75 +455,48 @@ if dashboard_mode == "Live Market":
                 filtered_df = df[df['Ticker'].isin(selected_tickers)].copy()
                 
                 # KPI ROW
-                cols = st.columns(min(len(selected_tickers), 4))
-                for i, ticker in enumerate(selected_tickers[:4]):
-                    ticker_df = filtered_df[filtered_df['Ticker'] == ticker]
-                    if not ticker_df.empty:
-                        latest = ticker_df.iloc[-1]
-                        start = ticker_df.iloc[0]
-                        price = latest['Close']
-                        change = ((price - start['Open']) / start['Open']) * 100
-                        with cols[i]:
-                            st.metric(label=ticker, value=f"${price:,.2f}", delta=f"{change:.2f}% (1d)")
+                with profiler.stage("KPI row") as stage:
+                    stage.rows = len(filtered_df)
+                    cols = st.columns(min(len(selected_tickers), 4))
+                    for i, ticker in enumerate(selected_tickers[:4]):
+                        ticker_df = filtered_df[filtered_df['Ticker'] == ticker]
+                        if not ticker_df.empty:
+                            latest = ticker_df.iloc[-1]
+                            start = ticker_df.iloc[0]
+                            price = latest['Close']
+                            change = ((price - start['Open']) / start['Open']) * 100
+                            with cols[i]:
+                                st.metric(label=ticker, value=f"${price:,.2f}", delta=f"{change:.2f}% ({time_range})")
 
                 # CHART AREA
                 st.markdown("### Price Action")
-                if chart_type == "Line":
-                    plot_df = filtered_df.copy()
-                    # Calculate SMA (Simple Moving Average)
-                    plot_df['SMA_20'] = plot_df.groupby('Ticker')['Close'].transform(lambda x: x.rolling(window=20).mean())
-
-                    if normalize:
-                        normalized_data = []
-                        for ticker in selected_tickers:
-                            t_df = plot_df[plot_df['Ticker'] == ticker].copy()
-                            start_price = t_df.iloc[0]['Open']
-                            t_df['Rel_Performance'] = ((t_df['Close'] - start_price) / start_price) * 100
-                            normalized_data.append(t_df)
-                        
-                        if normalized_data:
-                            plot_df = pd.concat(normalized_data)
-                            fig = px.line(plot_df, x='Date', y='Rel_Performance', color='Ticker', height=500)
-                        else:
-                            fig = go.Figure()
+                # Figure build includes the SMA / rollup transforms on a cache miss
+                with profiler.stage(f"figure build ({chart_type})"):
+                    if chart_type == "Line":
+                        fig = price_chart(chart_type, selected_asset, range_from, selected_tickers, normalize, show_sma)
                     else:
-                        fig = px.line(plot_df, x='Date', y='Close', color='Ticker', height=500)
-                        if show_sma:
-                            for ticker in selected_tickers:
-                                t_data = plot_df[plot_df['Ticker'] == ticker]
-                                fig.add_scatter(x=t_data['Date'], y=t_data['SMA_20'], mode='lines', 
-                                              name=f"{ticker} SMA", line=dict(width=1, dash='dot'), opacity=0.7)
-
-                    fig.update_layout(hovermode="x unified", template="plotly_dark")
-                    st.plotly_chart(fig, use_container_width=True)
-
-                else:
-                    # CANDLESTICK
-                    primary = selected_tickers[0]
-                    if len(selected_tickers) > 1: st.info(f"Showing Candlestick for: {primary}")
-                    candle_data = filtered_df[filtered_df['Ticker'] == primary]
-                    fig = go.Figure(data=[go.Candlestick(x=candle_data['Date'], open=candle_data['Open'], 
-                                                       high=candle_data['High'], low=candle_data['Low'], close=candle_data['Close'])])
-                    fig.update_layout(title=f"{primary} Price Action", height=500, template="plotly_dark", xaxis_rangeslider_visible=False)
+                        # CANDLESTICK: one panel per selected ticker, all from the already loaded asset class
+                        fig = price_chart(chart_type, selected_asset, range_from, selected_tickers)
+                with profiler.stage("chart render"):
                     st.plotly_chart(fig, use_container_width=True)
 
                 with st.expander("📂 View Underlying Data Grid"):
-                    st.dataframe(filtered_df.sort_values(by=['Date', 'Ticker'], ascending=[False, True]), use_container_width=True)
-
-            if auto_refresh:
-                time.sleep(15)
-                st.rerun()
+                    # Expander bodies run even when collapsed: only query once asked to
+                    if st.toggle("Load rows", key='grid_enabled'):
+                        with profiler.stage("data grid page"):
+                            render_data_grid(selected_tickers, range_from)
 
 # ==========================================
 # 5. MODE B: OPTIONS CHAIN
 # ==========================================
-else: # Options Mode
+elif dashboard_mode == "Options Chain":
     st.title("⛓️ Options Chain Viewer")
     
     if engine:
         try:
-            opt_tickers = pd.read_sql("SELECT DISTINCT Underlying_Ticker FROM Options_Data", engine)
-            opt_list = opt_tickers['Underlying_Ticker'].tolist()
+            with profiler.stage("underlyings (DISTINCT)") as stage:
+                opt_list = distinct_values('Options_Data', 'Underlying_Ticker', version_of('options'))
+                stage.rows = len(opt_list)
         except:
             opt_list = []
     else:
@@ -223,7 +506,10 @@ else: # Options Mode
         st.warning("No Options data found.")
     else:
         target_ticker = st.selectbox("Select Underlying Asset", opt_list)
-        df_opt = load_options_data(target_ticker)
+        with profiler.stage("load_options_data") as stage:
+            df_opt = load_options_data(target_ticker)
+            stage.rows = len(df_opt)
+        watched = [f"options:{target_ticker}"]
         
         if not df_opt.empty:
             # Ensure numeric columns (SQLite fix)
@@ -237,25 +523,237 @@ else: # Options Mode
             c2.metric("Expiry Date", str(expiry_date))
             
             st.subheader("Volatility Smile (IV vs Strike)")
-            fig = px.scatter(
-                df_opt, 
-                x='Strike', 
-                y='Implied_Volatility', 
-                color='Type', 
-                title=f"{target_ticker} Implied Volatility",
-                color_discrete_map={'Call': '#00CC96', 'Put': '#EF553B'},
-                hover_data=['Last_Price', 'Contract_Symbol']
-            )
-            fig.update_traces(marker=dict(size=8, opacity=0.7))
-            fig.update_layout(template="plotly_dark", height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            with profiler.stage("figure build (smile)"):
+                fig = figure_from_json(smile_chart_json(target_ticker, version_of(f"options:{target_ticker}")))
+            with profiler.stage("chart render"):
+                st.plotly_chart(fig, use_container_width=True)
             
-            col_calls, col_puts = st.columns(2)
-            with col_calls:
-                st.markdown("#### 🟢 Calls")
-                calls = df_opt[df_opt['Type'] == 'Call'].sort_values('Strike')
-                st.dataframe(calls[['Strike', 'Last_Price', 'Implied_Volatility']], use_container_width=True, hide_index=True)
-            with col_puts:
-                st.markdown("#### 🔴 Puts")
-                puts = df_opt[df_opt['Type'] == 'Put'].sort_values('Strike')
-                st.dataframe(puts[['Strike', 'Last_Price', 'Implied_Volatility']], use_container_width=True, hide_index=True)
\ No newline at end of file
+            with profiler.stage("dataframe render") as stage:
+                stage.rows = len(df_opt)
+                col_calls, col_puts = st.columns(2)
+                with col_calls:
+                    st.markdown("#### 🟢 Calls")
+                    calls = df_opt[df_opt['Type'] == 'Call'].sort_values('Strike')
+                    st.dataframe(calls[['Strike', 'Last_Price', 'Implied_Volatility']], use_container_width=True, hide_index=True)
+                with col_puts:
+                    st.markdown("#### 🔴 Puts")
+                    puts = df_opt[df_opt['Type'] == 'Put'].sort_values('Strike')
+                    st.dataframe(puts[['Strike', 'Last_Price', 'Implied_Volatility']], use_container_width=True, hide_index=True)
+
+# ==========================================
+# 6. MODE C: OPTIONS HISTORY
+# ==========================================
+elif dashboard_mode == "Options History":
+    st.title("📜 Options History")
+
+    if engine:
+        try:
+            with profiler.stage("underlyings (DISTINCT)") as stage:
+                opt_list = distinct_values('Options_Data', 'Underlying_Ticker', version_of('options'))
+                stage.rows = len(opt_list)
+        except:
+            opt_list = []
+    else:
+        opt_list = []
+
+    if not opt_list:
+        st.warning("No Options data found.")
+    else:
+        target_ticker = st.sidebar.selectbox("Underlying Asset", opt_list)
+        lookback_days = st.sidebar.select_slider("History (days)", options=[1, 7, 30, 90, 180], value=30)
+        watched = [f"options:{target_ticker}"]
+
+        try:
+            with profiler.stage("options history") as stage:
+                history = options_history(target_ticker, lookback_days)
+                stage.rows = len(history)
+        except Exception as e:
+            st.error(f"Query Error: {e}")
+            history = pd.DataFrame()
+
+        if history.empty:
+            st.warning("No option snapshots in the selected period.")
+        else:
+            latest = history[history['Last_Updated'] == history['Last_Updated'].max()].iloc[0]
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Snapshots", history['Last_Updated'].nunique())
+            c2.metric("ATM Strike", f"{latest['ATM_Strike']:,.2f}")
+            c3.metric("ATM IV", f"{latest['ATM_IV']:.2%}")
+            c4.metric("Skew", f"{latest['Skew']:+.2%}")
+            with profiler.stage("figure build + render (history)"):
+                st.plotly_chart(options_history_chart(history, target_ticker), use_container_width=True)
+
+            st.markdown("#### Contract History")
+            chain = latest_contracts(target_ticker, version_of(f"options:{target_ticker}"))
+            if not chain.empty:
+                symbols = chain['Contract_Symbol'].tolist()
+                # Start on the call closest to the money
+                calls = chain[chain['Type'] == 'Call']
+                default = calls.loc[(calls['Strike'] - latest['ATM_Strike']).abs().idxmin(), 'Contract_Symbol'] if not calls.empty else symbols[0]
+                symbol = st.selectbox("Contract", symbols, index=symbols.index(default))
+                with profiler.stage("contract history") as stage:
+                    contract_df = contract_history(target_ticker, symbol, lookback_days, version_of(f"options:{target_ticker}"))
+                    stage.rows = len(contract_df)
+                if not contract_df.empty:
+                    st.plotly_chart(contract_history_chart(contract_df, symbol), use_container_width=True)
+
+# ==========================================
+# 7. MODE D: CROSS-ASSET CORRELATION
+# ==========================================
+elif dashboard_mode == "Correlation Matrix":
+    st.title("🧮 Cross-Asset Correlation")
+
+    if not engine:
+        st.warning("No database connected.")
+    else:
+        window = st.sidebar.select_slider("Rolling Window (bars)", options=[20, 50, 100, 200], value=50)
+        lookback_days = st.sidebar.slider("History Loaded (days)", 2, 30, 7,
+                                          help="Only needs to cover the window; 15m bars across time zones")
+        matrix_kind = st.sidebar.radio("Matrix", ["Correlation", "Covariance"], horizontal=True)
+        watched = ['market']
+
+        try:
+            with profiler.stage("correlation update"):
+                snapshot = current_correlation(window, lookback_days)
+        except Exception as e:
+            st.error(f"Query Error: {e}")
+            snapshot = None
+
+        if snapshot is None:
+            st.warning("Database connected but empty. Run your ETL script!")
+        else:
+            corr = snapshot['correlation']
+            matrix = corr if matrix_kind == "Correlation" else snapshot['covariance']
+            tickers = snapshot['tickers']
+
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Instruments", len(tickers))
+            c2.metric("Bars in Window", snapshot['count'])
+            c3.metric("Latest Bar", str(snapshot['last_date']))
+
+            with profiler.stage("figure build (heatmap)"):
+                if matrix_kind == "Correlation":
+                    fig = px.imshow(matrix, x=tickers, y=tickers, zmin=-1, zmax=1,
+                                    color_continuous_scale='RdBu_r', aspect='auto')
+                else:
+                    fig = px.imshow(matrix, x=tickers, y=tickers,
+                                    color_continuous_scale='Viridis', aspect='auto')
+                fig.update_layout(template="plotly_dark", height=750)
+            with profiler.stage("chart render"):
+                st.plotly_chart(fig, use_container_width=True)
+
+            st.markdown("#### Strongest Cross-Asset Pairs")
+            st.dataframe(top_pairs(corr, tickers, snapshot['groups'], n=15),
+                         use_container_width=True, hide_index=True)
+
+# ==========================================
+# 8. MODE E: MARKET-WIDE SCREENER
+# ==========================================
+else:
+    st.title("🔎 Market Screener")
+
+    if not engine:
+        st.warning("No database connected.")
+    else:
+        sort_labels = {
+            'Day Change %': 'Day_Change_Pct', 'Week Change %': 'Week_Change_Pct',
+            'Volatility %': 'Volatility_Pct', 'Volume': 'Volume',
+            'Distance from SMA %': 'SMA_Distance_Pct', 'Last Price': 'Last_Price', 'Ticker': 'Ticker',
+        }
+        sort_label = st.sidebar.selectbox("Sort By", list(sort_labels), index=0)
+        descending = st.sidebar.toggle("Descending", value=True)
+        limit = st.sidebar.select_slider("Rows", options=[25, 50, 100, 250, 500], value=50)
+        min_volume = st.sidebar.number_input("Min Volume (last day)", min_value=0, value=0, step=10000)
+        watched = ['market']
+
+        has_summary = has_table('Ticker_Summary', version_of('market'))
+        try:
+            if has_summary:
+                with profiler.stage("asset classes (DISTINCT)"):
+                    classes = distinct_values('Ticker_Summary', 'Asset_Type', version_of('market'))
+                selected_classes = st.sidebar.multiselect("Asset Classes", classes, default=classes,
+                                                          help="Leave empty to include every class")
+                with profiler.stage("load_screener") as stage:
+                    screen = load_screener(selected_classes, sort_labels[sort_label], descending, limit, min_volume,
+                                           version=version_of('market'))
+                    stage.rows = len(screen)
+            else:
+                st.caption("Ticker_Summary not found: summary computed from the snapshot instead.")
+                with profiler.stage("snapshot summary") as stage:
+                    summary = snapshot_summary()
+                    stage.rows = len(summary)
+                classes = summary['Asset_Type'].unique().tolist()
+                selected_classes = st.sidebar.multiselect("Asset Classes", classes, default=classes,
+                                                          help="Leave empty to include every class")
+                # An empty selection means no class filter, as in load_screener
+                screen = summary[summary['Volume'].fillna(0) >= min_volume]
+                if selected_classes:
+                    screen = screen[screen['Asset_Type'].isin(selected_classes)]
+                screen = screen.sort_values(sort_labels[sort_label], ascending=not descending).head(limit)
+        except Exception as e:
+            st.error(f"Query Error: {e}")
+            screen = pd.DataFrame()
+
+        if screen.empty:
+            st.warning("No tickers match the current filters.")
+        else:
+            pct = st.column_config.NumberColumn(format="%.2f%%")
+            with profiler.stage("dataframe render") as stage:
+                stage.rows = len(screen)
+                st.dataframe(
+                    screen,
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        'Last_Price': st.column_config.NumberColumn("Last Price", format="%.4f"),
+                        'Day_Change_Pct': pct, 'Week_Change_Pct': pct, 'Volatility_Pct': pct, 'SMA_Distance_Pct': pct,
+                        'Volume': st.column_config.NumberColumn(format="%d"),
+                    },
+                )
+
+# ==========================================
+# 9. LIVE UPDATES
+# ==========================================
+@st.fragment(run_every=POLL_SECONDS)
+def watch_for_changes(channels):
+    # Reruns on its own: one tiny version query per poll, a full rerun only when a watched channel moved
+    latest = current_versions(engine)
+    if any(latest.get(c, 0) != version_of(c) for c in channels):
+        st.rerun()
+    st.caption(f"Watching for new data · checked {time.strftime('%H:%M:%S')}")
+
+if live_updates and watched:
+    with st.sidebar:
+        watch_for_changes(watched)
+
+# ==========================================
+# 10. RERUN PROFILE
+# ==========================================
+st.sidebar.markdown("---")
+st.sidebar.toggle("⏱️ Profile Reruns", value=enabled_by_env(), key='profiling',
+                  help="Time each stage of the rerun (also on with MARKET_MONITOR_PROFILE=1)")
+if profiler.enabled:
+    st.sidebar.checkbox("Trace memory (slower)", value=True, key='profile_memory')
+    st.sidebar.checkbox("Save cProfile dump", value=False, key='profile_dump')
+
+    breakdown, total = profiler.finish()
+    st.session_state.pop('profiler', None)
+    dump_path = profiler.dump(dashboard_mode)
+
+    with st.expander(f"⏱️ Rerun Profile: {total * 1000:,.0f} ms", expanded=True):
+        st.dataframe(
+            breakdown.assign(Seconds=breakdown['Seconds'] * 1000, Share=breakdown['Share'] * 100),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'Seconds': st.column_config.NumberColumn("ms", format="%.1f"),
+                'Share': st.column_config.ProgressColumn(format="%.0f%%", min_value=0, max_value=100),
+                'Allocated_MB': st.column_config.NumberColumn(format="%.2f"),
+                'Peak_MB': st.column_config.NumberColumn(format="%.2f"),
+            },
+        )
+        if dump_path:
+            st.caption(f"cProfile written to {dump_path} (open with snakeviz or python -m pstats)")
+else:
+    profiler.close()
+    st.session_state.pop('profiler', None)
@@ -0,0 +1,34 @@
+from sqlalchemy import inspect, text
+
+# ==========================================
+# SHARED DATABASE HELPERS (SQL Server + SQLite)
+# ==========================================
+
+# SQL Server caps a statement at 2100 parameters; stay well below for IN (...) lists
+IN_CHUNK = 500
+
+def ensure_index(engine, table_name, index_name, columns):
+    """Create the index if the table exists and the index does not. Returns True if present."""
+    try:
+        insp = inspect(engine)
+        if not insp.has_table(table_name):
+            return False
+        if any(ix['name'] == index_name for ix in insp.get_indexes(table_name)):
+            return True
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX {index_name} ON {table_name} ({', '.join(columns)})"))
+        print(f"Created index {index_name} on {table_name}")
+        return True
+    except Exception as e:
+        print(f"Index Error ({index_name}): {e}")
+        return False
+
+def chunks(items, size=IN_CHUNK):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def in_clause(column, values, prefix='p'):
+    """Return ("column IN (:p0, :p1, ...)", params) for a text() query."""
+    params = {f"{prefix}{i}": value for i, value in enumerate(values)}
+    return f"{column} IN ({', '.join(':' + name for name in params)})", params
@@ -1,9 +1,19 @@
-import yfinance as yf
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import String, create_engine, inspect, text
 import urllib.parse
-from datetime import datetime
+from datetime import datetime, timedelta
 import time  # Added for the loop delay
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from analytics import summarize_tickers
+from db_utils import chunks, ensure_index, in_clause
+from market_hours import MarketHoursFilter
+from notifications import market_channels, publish
+from replay import add_source_arguments, source_from_args
+from scheduler import DEFAULT_RATE, RequestScheduler, yfinance_transport
+from watchlist import load_watchlist, parse_shard, shard_assets, worker_of
 
 # ==========================================
 # 1. CONFIGURATION: TOP 15 ASSETS
@@ -54,103 +64,277 @@ try:
     connection_string = f"mssql+pyodbc:///?odbc_connect={params}"
     engine = create_engine(connection_string, fast_executemany=True)
 except Exception as e:
+    engine = None
     print(f"Configuration Error: {e}")
 
 # ==========================================
 # 3. ETL LOGIC
 # ==========================================
 
-def fetch_and_load(asset_dict):
+def transform_batch(raw_data, tickers, category):
+    """Split one yf.download batch into per-ticker frames in the MarketData layout."""
+    frames = []
+
+    for ticker in tickers:
+        try:
+            # Handle yfinance multi-index structure
+            if len(tickers) > 1:
+                if ticker not in raw_data.columns.levels[0]:
+                    continue
+                df = raw_data[ticker].copy()
+            else:
+                df = raw_data.copy()
+
+            if df.empty:
+                continue
+            
+            # Standardize Date Column
+            df = df.reset_index()
+            col_map = {'Datetime': 'Date', 'index': 'Date'}
+            df.rename(columns=col_map, inplace=True)
+
+            # --- CRITICAL FIX START ---
+            # Remove Timezone info to prevent SQL "String data, right truncation" error
+            if 'Date' in df.columns and pd.api.types.is_datetime64_any_dtype(df['Date']):
+                df['Date'] = df['Date'].dt.tz_localize(None)
+            # --- CRITICAL FIX END ---
+            
+            df['Ticker'] = ticker
+            df['Asset_Type'] = category
+            df['Last_Updated'] = datetime.now()
+            
+            df.rename(columns={
+                'Open': 'Open', 'High': 'High', 'Low': 'Low', 'Close': 'Close'
+            }, inplace=True)
+
+            cols_to_keep = ['Ticker', 'Asset_Type', 'Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'Last_Updated']
+            
+            for col in cols_to_keep:
+                if col not in df.columns:
+                    df[col] = None
+                    
+            df = df[cols_to_keep]
+            df.dropna(subset=['Close'], inplace=True)
+            frames.append(df)
+
+        except Exception as e:
+            print(f"Error processing ticker {ticker}: {e}")
+
+    return frames
+
+def fetch_and_load(asset_dict, downloader=yfinance_transport, target_engine=None, scheduler=None):
     print(f"--- Starting ETL Job at {datetime.now()} ---")
     
     all_data = []
+    # Pass a long-lived scheduler to keep the learned batch size between cycles
+    if scheduler is None:
+        scheduler = RequestScheduler(downloader)
 
     for category, tickers in asset_dict.items():
         print(f"Fetching data for: {category}...")
         
         try:
             # Download batch data: 1 Day period, 15 Minute interval
-            raw_data = yf.download(tickers, period="1d", interval="15m", group_by='ticker', auto_adjust=True, progress=False)
-            
-            if raw_data.empty:
-                print(f"No data found for {category}")
-                continue
+            batches = scheduler.fetch(tickers, period="1d", interval="15m", group_by='ticker', auto_adjust=True, progress=False)
+            fetched = 0
+            for batch_tickers, raw_data in batches:
+                frames = transform_batch(raw_data, batch_tickers, category)
+                fetched += len(frames)
+                all_data.extend(frames)
 
-            for ticker in tickers:
-                try:
-                    # Handle yfinance multi-index structure
-                    if len(tickers) > 1:
-                        if ticker not in raw_data.columns.levels[0]:
-                            continue
-                        df = raw_data[ticker].copy()
-                    else:
-                        df = raw_data.copy()
-
-                    if df.empty:
-                        continue
-                    
-                    # Standardize Date Column
-                    df = df.reset_index()
-                    col_map = {'Datetime': 'Date', 'index': 'Date'}
-                    df.rename(columns=col_map, inplace=True)
-
-                    # --- CRITICAL FIX START ---
-                    # Remove Timezone info to prevent SQL "String data, right truncation" error
-                    if 'Date' in df.columns and pd.api.types.is_datetime64_any_dtype(df['Date']):
-                        df['Date'] = df['Date'].dt.tz_localize(None)
-                    # --- CRITICAL FIX END ---
-                    
-                    df['Ticker'] = ticker
-                    df['Asset_Type'] = category
-                    df['Last_Updated'] = datetime.now()
-                    
-                    df.rename(columns={
-                        'Open': 'Open', 'High': 'High', 'Low': 'Low', 'Close': 'Close'
-                    }, inplace=True)
-
-                    cols_to_keep = ['Ticker', 'Asset_Type', 'Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'Last_Updated']
-                    
-                    for col in cols_to_keep:
-                        if col not in df.columns:
-                            df[col] = None
-                            
-                    df = df[cols_to_keep]
-                    df.dropna(subset=['Close'], inplace=True)
-                    all_data.append(df)
-
-                except Exception as e:
-                    print(f"Error processing ticker {ticker}: {e}")
+            if not fetched:
+                print(f"No data found for {category}")
 
         except Exception as e:
             print(f"Batch download error for {category}: {e}")
 
+    dead = scheduler.drain_dead_letter()
+    if dead:
+        print(f"Gave up on {len(dead)} tickers this cycle: " + ", ".join(f"{t} ({reason})" for t, reason in dead.items()))
+
     # ==========================================
     # 4. LOAD TO SQL SERVER
     # ==========================================
+    target_engine = target_engine if target_engine is not None else engine
     if all_data:
         final_df = pd.concat(all_data)
-        print(f"Uploading {len(final_df)} rows to SQL Server...")
-        
-        try:
-            final_df.to_sql('MarketData', engine, if_exists='append', index=False)
-            print("Success! Data loaded.")
-        except Exception as e:
-            print(f"SQL Connection Error: {e}")
-            print("\n*** TROUBLESHOOTING ***")
-            print("1. If you get 'String data, right truncation', verify the Timezone fix code block is present.")
-            print("2. Ensure columns in SQL Match columns in Python exactly.")
+        if load_to_sql(final_df, target_engine):
+            refresh_ticker_summary(target_engine, final_df['Ticker'].unique(), final_df['Date'].max())
+            # Tell the dashboards which asset classes just changed
+            publish(target_engine, market_channels(final_df['Asset_Type'].unique()))
     else:
         print("No data fetched to upload.")
 
+def load_to_sql(final_df, target_engine):
+    print(f"Uploading {len(final_df)} rows to SQL Server...")
+    
+    try:
+        final_df.to_sql('MarketData', target_engine, if_exists='append', index=False)
+        print("Success! Data loaded.")
+        return True
+    except Exception as e:
+        print(f"SQL Connection Error: {e}")
+        print("\n*** TROUBLESHOOTING ***")
+        print("1. If you get 'String data, right truncation', verify the Timezone fix code block is present.")
+        print("2. Ensure columns in SQL Match columns in Python exactly.")
+        return False
+
+# ==========================================
+# 5. SCREENER SUMMARY TABLE
+# ==========================================
+# Ticker_Summary holds one precomputed row per ticker (last price, day/week change,
+# volatility, volume, SMA distance) so the dashboard screener is a single small
+# indexed query instead of loading every asset class.
+
+SUMMARY_LOOKBACK_DAYS = 8
+# Bounded key columns: pandas would create TEXT / VARCHAR(max), which SQL Server cannot index
+SUMMARY_DTYPES = {'Ticker': String(32), 'Asset_Type': String(32)}
+
+def ensure_indexes(target_engine):
+    ensure_index(target_engine, 'MarketData', 'IX_MarketData_Ticker_Date', ['Ticker', 'Date'])
+    # Dashboard time-range loads, and the per-ticker backward walks of the data grid's keyset pagination
+    ensure_index(target_engine, 'MarketData', 'IX_MarketData_Asset_Type_Date', ['Asset_Type', 'Date'])
+    ensure_index(target_engine, 'MarketData', 'IX_MarketData_Ticker_Date_Updated', ['Ticker', 'Date', 'Last_Updated'])
+    ensure_index(target_engine, 'Ticker_Summary', 'IX_Ticker_Summary_Ticker', ['Ticker'])
+    ensure_index(target_engine, 'Ticker_Summary', 'IX_Ticker_Summary_Asset_Type', ['Asset_Type'])
+
+def ensure_summary_table(target_engine, summary):
+    """Create Ticker_Summary with the columns of `summary`. Returns True if this call created it."""
+    if inspect(target_engine).has_table('Ticker_Summary'):
+        return False
+    try:
+        with target_engine.begin() as conn:
+            summary.head(0).to_sql('Ticker_Summary', conn, if_exists='fail', index=False, dtype=SUMMARY_DTYPES)
+        return True
+    except Exception:
+        # Another shard worker created it first
+        if not inspect(target_engine).has_table('Ticker_Summary'):
+            raise
+        return False
+
+def refresh_ticker_summary(target_engine, tickers, latest_bar):
+    try:
+        # Relative to the data, not the clock, so replays of old captures work too
+        start = (pd.Timestamp(latest_bar) - timedelta(days=SUMMARY_LOOKBACK_DAYS)).to_pydatetime()
+        frames = []
+        with target_engine.connect() as conn:
+            for chunk in chunks(tickers):
+                condition, params = in_clause('Ticker', chunk)
+                # Only the newest load of each bar: every cycle re-appends the day, so raw rows grow with the duplicates
+                query = text(
+                    "SELECT m.Ticker, m.Asset_Type, m.Date, m.Close, m.Volume, m.Last_Updated FROM MarketData m "
+                    "JOIN (SELECT Ticker, Date, MAX(Last_Updated) AS Newest FROM MarketData "
+                    f"WHERE {condition} AND Date >= :start GROUP BY Ticker, Date) n "
+                    "ON m.Ticker = n.Ticker AND m.Date = n.Date AND m.Last_Updated = n.Newest"
+                )
+                frames.append(pd.read_sql(query, conn, params={**params, 'start': start}))
+        bars = pd.concat(frames)
+        if bars.empty:
+            return
+
+        summary = summarize_tickers(bars)
+        if ensure_summary_table(target_engine, summary):
+            ensure_indexes(target_engine)
+        # Replace this batch's rows in one transaction so readers never see them missing
+        with target_engine.begin() as conn:
+            for chunk in chunks(summary['Ticker']):
+                condition, params = in_clause('Ticker', chunk)
+                conn.execute(text(f"DELETE FROM Ticker_Summary WHERE {condition}"), params)
+            summary.to_sql('Ticker_Summary', conn, if_exists='append', index=False, dtype=SUMMARY_DTYPES)
+        print(f"Ticker summary refreshed for {len(summary)} tickers.")
+    except Exception as e:
+        print(f"Summary Refresh Error: {e}")
+
 # ==========================================
-# 5. MAIN LOOP (RUNS FOREVER)
+# 6. SHARDED MULTI-PROCESS RUN
+# ==========================================
+# Each worker process owns the tickers that hash to its shard, downloads and
+# transforms them independently and writes its own batch to the database.
+
+_worker_engine = None
+_worker_scheduler = None
+
+def _init_worker(db_url, downloader, rate):
+    global _worker_engine, _worker_scheduler
+    # Never share pooled connections inherited from the parent process
+    if db_url:
+        _worker_engine = create_engine(db_url)
+    else:
+        _worker_engine = create_engine(connection_string, fast_executemany=True)
+    # One scheduler per process for its lifetime, so the learned batch size and throttled rate carry over between cycles
+    _worker_scheduler = RequestScheduler(downloader, rate=rate)
+
+def start_pool(workers, downloader=yfinance_transport, db_url=None, rate=DEFAULT_RATE):
+    """Worker processes kept across cycles; `rate` is split so the N workers together stay under it."""
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(db_url, downloader, rate / workers))
+
+def _run_shard(shard_dict):
+    fetch_and_load(shard_dict, target_engine=_worker_engine, scheduler=_worker_scheduler)
+
+def run_sharded(pool, asset_dict, workers):
+    shards = [shard_assets(asset_dict, i, workers, assign=worker_of) for i in range(workers)]
+    shards = [shard for shard in shards if shard]
+    print(f"Running {len(shards)} shards across {workers} worker processes...")
+
+    futures = [pool.submit(_run_shard, shard) for shard in shards]
+    for future in futures:
+        try:
+            future.result()
+        except BrokenProcessPool:
+            # A worker died; the caller replaces the pool
+            raise
+        except Exception as e:
+            print(f"Shard Failure: {e}")
+
+# ==========================================
+# 7. MAIN LOOP (RUNS FOREVER)
 # ==========================================
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Price ETL worker")
+    add_source_arguments(parser)
+    parser.add_argument('--db-url', help="SQLAlchemy URL to load into instead of the configured SQL Server (e.g. sqlite:///stress.db)")
+    parser.add_argument('--workers', type=int, default=1, help="Split the watchlist across this many worker processes")
+    parser.add_argument('--shard', type=parse_shard, metavar='K/N',
+                        help="Only process shard K of N (for running N separate daemons)")
+    parser.add_argument('--all-hours', action='store_true',
+                        help="Fetch every market every cycle, ignoring trading sessions")
+    args = parser.parse_args()
+    if args.workers > 1 and (args.record or args.replay):
+        # Each worker would get its own copy of the capture cursor and overwrite or re-read the same files
+        parser.error("--record/--replay run in a single process; drop --workers")
+    target_engine = create_engine(args.db_url) if args.db_url else engine
+    source, sleep_scale = source_from_args(args)
+    downloader = source.download if source else yfinance_transport
+    # N --shard daemons share the one request budget
+    rate = DEFAULT_RATE / args.shard[1] if args.shard else DEFAULT_RATE
+    scheduler = RequestScheduler(downloader, rate=rate)
+    pool = start_pool(args.workers, downloader, args.db_url, rate) if args.workers > 1 else None
+    # Replays are not tied to the wall clock, so they always fetch everything
+    hours = None if (args.all_hours or args.replay) else MarketHoursFilter()
+    ensure_indexes(target_engine)
+
     while True:
         try:
-            fetch_and_load(assets)
+            # Reloaded every cycle so watchlist edits apply without a restart
+            watchlist = load_watchlist(assets, engine=target_engine)
+            if args.shard:
+                watchlist = shard_assets(watchlist, *args.shard)
+            if hours:
+                watchlist = hours.active_assets(watchlist)
+
+            if not watchlist:
+                print("All tracked markets are closed.")
+            elif args.workers > 1:
+                run_sharded(pool, watchlist, args.workers)
+            else:
+                fetch_and_load(watchlist, target_engine=target_engine, scheduler=scheduler)
+        except BrokenProcessPool as e:
+            print(f"Critical Job Failure: {e} - restarting worker processes")
+            pool.shutdown(wait=False)
+            pool = start_pool(args.workers, downloader, args.db_url, rate)
         except Exception as e:
             print(f"Critical Job Failure: {e}")
         
         print("Sleeping for 15 minutes... (Press Ctrl+C to stop)")
-        time.sleep(900) # 900 seconds = 15 minutes
\ No newline at end of file
+        time.sleep(900 * sleep_scale) # 900 seconds = 15 minutes (scaled down in replay mode)
@@ -4,6 +4,14 @@ from sqlalchemy import create_engine
 import urllib.parse
 from datetime import datetime
 import time
+import argparse
+import os
+
+from cache import DiskCache
+from db_utils import ensure_index
+from market_hours import NYSE
+from notifications import options_channels, publish
+from replay import add_source_arguments, source_from_args
 
 # ==========================================
 # 1. CONFIGURATION
@@ -11,6 +19,14 @@ import time
 # We focus on the most active Option Chains to keep performance high
 TARGET_TICKERS = ['AAPL', 'NVDA', 'TSLA', 'SPY', 'QQQ', 'MSFT', 'AMZN']
 
+# Expiration lists only change when a series lists or expires: cache them on disk
+EXPIRATIONS_TTL = 6 * 3600
+
+# Skip re-fetching a chain whose latest snapshot is younger than this.
+# While the market is closed prices do not move, so one snapshot per half-day is plenty.
+REFRESH_WHEN_OPEN = 25 * 60
+REFRESH_WHEN_CLOSED = 12 * 3600
+
 # ==========================================
 # 2. DATABASE CONNECTION
 # ==========================================
@@ -26,22 +42,100 @@ try:
     connection_string = f"mssql+pyodbc:///?odbc_connect={params}"
     engine = create_engine(connection_string, fast_executemany=True)
 except Exception as e:
+    engine = None
     print(f"Configuration Error: {e}")
 
 # ==========================================
 # 3. OPTIONS FETCHING LOGIC
 # ==========================================
-def fetch_options(tickers):
+def transform_chain(chain, ticker_symbol, target_date):
+    """Flatten one option_chain() result into a frame in the Options_Data layout."""
+    # Process CALLS
+    calls = chain.calls.copy()
+    calls['Type'] = 'Call'
+    
+    # Process PUTS
+    puts = chain.puts.copy()
+    puts['Type'] = 'Put'
+    
+    # Combine
+    df = pd.concat([calls, puts])
+    
+    # Clean and Format for SQL
+    df['Underlying_Ticker'] = ticker_symbol
+    df['Expiry'] = target_date
+    df['Last_Updated'] = datetime.now()
+    
+    # Map YFinance columns to SQL Columns
+    # YF: contractSymbol, strike, lastPrice, impliedVolatility
+    df = df.rename(columns={
+        'contractSymbol': 'Contract_Symbol',
+        'strike': 'Strike',
+        'lastPrice': 'Last_Price',
+        'impliedVolatility': 'Implied_Volatility'
+    })
+    
+    # Select only columns that match our SQL Table
+    cols_to_keep = ['Underlying_Ticker', 'Contract_Symbol', 'Type', 'Strike', 'Expiry', 'Last_Price', 'Implied_Volatility', 'Last_Updated']
+    
+    # Ensure columns exist
+    for c in cols_to_keep:
+        if c not in df.columns:
+            df[c] = None
+    
+    return df[cols_to_keep]
+
+def ensure_indexes(target_engine):
+    # Per-contract history seeks, and per-underlying snapshot scans ordered by time
+    ensure_index(target_engine, 'Options_Data', 'IX_Options_Data_Underlying_Contract_Updated',
+                 ['Underlying_Ticker', 'Contract_Symbol', 'Last_Updated'])
+    ensure_index(target_engine, 'Options_Data', 'IX_Options_Data_Underlying_Updated',
+                 ['Underlying_Ticker', 'Last_Updated'])
+
+def last_snapshots(target_engine):
+    """Latest Last_Updated per underlying, from one grouped query."""
+    try:
+        df = pd.read_sql("SELECT Underlying_Ticker, MAX(Last_Updated) AS Last_Snapshot FROM Options_Data GROUP BY Underlying_Ticker", target_engine)
+        return dict(zip(df['Underlying_Ticker'], pd.to_datetime(df['Last_Snapshot'])))
+    except Exception:
+        # Table not created yet: everything is due
+        return {}
+
+def cached_expirations(tk, ticker_symbol, cache):
+    key = f"options:{ticker_symbol}"
+    expirations = cache.get(key, EXPIRATIONS_TTL)
+    if expirations is not None:
+        # A cached list can still hold a series that expired since it was fetched
+        today = datetime.now().strftime('%Y-%m-%d')
+        expirations = [e for e in expirations if e >= today]
+
+    if not expirations:
+        expirations = tuple(tk.options)
+        if expirations:
+            cache.set(key, expirations)
+    return expirations
+
+def fetch_options(tickers, ticker_factory=yf.Ticker, target_engine=None, cache=None, force=False):
     print(f"\n--- Starting Options Scan at {datetime.now().strftime('%H:%M:%S')} ---")
     all_options = []
+    target_engine = target_engine if target_engine is not None else engine
+    cache = cache if cache is not None else DiskCache()
+
+    refresh_after = REFRESH_WHEN_OPEN if NYSE.is_open(pd.Timestamp.now(tz='UTC')) else REFRESH_WHEN_CLOSED
+    snapshots = {} if force else last_snapshots(target_engine)
 
     for ticker_symbol in tickers:
         try:
+            last = snapshots.get(ticker_symbol)
+            if last is not None and (datetime.now() - last).total_seconds() < refresh_after:
+                print(f"  > {ticker_symbol}: snapshot from {last:%H:%M} is fresh, skipping")
+                continue
+
             print(f"Checking Options for {ticker_symbol}...")
-            tk = yf.Ticker(ticker_symbol)
+            tk = ticker_factory(ticker_symbol)
             
             # Get available expiration dates
-            expirations = tk.options
+            expirations = cached_expirations(tk, ticker_symbol, cache)
             if not expirations:
                 print(f"  > No options found for {ticker_symbol}")
                 continue
@@ -53,42 +147,7 @@ def fetch_options(tickers):
             
             # Get the chain
             chain = tk.option_chain(target_date)
-            
-            # Process CALLS
-            calls = chain.calls.copy()
-            calls['Type'] = 'Call'
-            
-            # Process PUTS
-            puts = chain.puts.copy()
-            puts['Type'] = 'Put'
-            
-            # Combine
-            df = pd.concat([calls, puts])
-            
-            # Clean and Format for SQL
-            df['Underlying_Ticker'] = ticker_symbol
-            df['Expiry'] = target_date
-            df['Last_Updated'] = datetime.now()
-            
-            # Map YFinance columns to SQL Columns
-            # YF: contractSymbol, strike, lastPrice, impliedVolatility
-            df = df.rename(columns={
-                'contractSymbol': 'Contract_Symbol',
-                'strike': 'Strike',
-                'lastPrice': 'Last_Price',
-                'impliedVolatility': 'Implied_Volatility'
-            })
-            
-            # Select only columns that match our SQL Table
-            cols_to_keep = ['Underlying_Ticker', 'Contract_Symbol', 'Type', 'Strike', 'Expiry', 'Last_Price', 'Implied_Volatility', 'Last_Updated']
-            
-            # Ensure columns exist
-            for c in cols_to_keep:
-                if c not in df.columns:
-                    df[c] = None
-            
-            df = df[cols_to_keep]
-            all_options.append(df)
+            all_options.append(transform_chain(chain, ticker_symbol, target_date))
             
         except Exception as e:
             print(f"  > Error fetching {ticker_symbol}: {e}")
@@ -104,19 +163,41 @@ def fetch_options(tickers):
             # We use 'append' here. In a real production app for options, 
             # you often want to clear old data or use a 'Snapshot_Time' column.
             # For this demo, we append to build history.
-            final_df.to_sql('Options_Data', engine, if_exists='append', index=False)
+            final_df.to_sql('Options_Data', target_engine, if_exists='append', index=False)
             print("Success! Options loaded.")
+            publish(target_engine, options_channels(final_df['Underlying_Ticker'].unique()))
+            if not snapshots:
+                # First load may have just created the table
+                ensure_indexes(target_engine)
         except Exception as e:
             print(f"SQL Error: {e}")
     else:
         print("No options data retrieved.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Options ETL worker")
+    add_source_arguments(parser)
+    parser.add_argument('--db-url', help="SQLAlchemy URL to load into instead of the configured SQL Server (e.g. sqlite:///stress.db)")
+    args = parser.parse_args()
+    target_engine = create_engine(args.db_url) if args.db_url else engine
+    source, sleep_scale = source_from_args(args)
+    ticker_factory = source.ticker if source else yf.Ticker
+    capture = args.replay or args.record
+    if capture:
+        # Captures keep their own expiration cache: a warm shared cache would skip tk.options
+        # while recording, leaving the capture without the 'options' entries replay needs
+        cache = DiskCache(os.path.join(capture, '.cache'))
+    else:
+        cache = DiskCache()
+    # Replays re-scan everything
+    force = bool(args.replay)
+    ensure_indexes(target_engine)
+
     # Run once immediately
-    fetch_options(TARGET_TICKERS)
+    fetch_options(TARGET_TICKERS, ticker_factory=ticker_factory, target_engine=target_engine, cache=cache, force=force)
     
     # Optional: Loop automatically
     while True:
         print("Sleeping for 30 minutes (Options update slower than prices)...")
-        time.sleep(1800) # 30 mins
-        fetch_options(TARGET_TICKERS)
\ No newline at end of file
+        time.sleep(1800 * sleep_scale) # 30 mins (scaled down in replay mode)
+        fetch_options(TARGET_TICKERS, ticker_factory=ticker_factory, target_engine=target_engine, cache=cache, force=force)
@@ -0,0 +1,243 @@
+import argparse
+import time
+import urllib.parse
+from datetime import datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text
+
+from analytics import resample_ohlc
+from db_utils import ensure_index
+
+# ==========================================
+# 1. CONFIGURATION
+# ==========================================
+# Both ETL workers append overlapping data every cycle, so the history tables
+# collect duplicates that every dashboard query has to scan. This job:
+#   1. deletes duplicate bars, keeping the newest load of each (Ticker, Date)
+#   2. rolls intraday bars older than --compact-after-days up into --rollup buckets
+#   3. thins option snapshots older than --prune-after-days to one per contract per --sample
+#   4. refreshes statistics / reclaims space (ANALYZE [+ VACUUM] or index reorganize + stats)
+# Work is done one ticker per short transaction, with a pause in between, so the
+# dashboards and the ETL keep running while it does.
+
+SERVER_NAME = r'localhost\fyt'
+DATABASE_NAME = 'YahooFinanceDB'
+DRIVER = 'ODBC Driver 17 for SQL Server'
+
+def connect(db_url=None):
+    if db_url:
+        return create_engine(db_url)
+    params = urllib.parse.quote_plus(
+        f"DRIVER={{{DRIVER}}};SERVER={SERVER_NAME};DATABASE={DATABASE_NAME};Trusted_Connection=yes;"
+    )
+    return create_engine(f"mssql+pyodbc:///?odbc_connect={params}", fast_executemany=True)
+
+# ==========================================
+# 2. MEASUREMENT
+# ==========================================
+
+def table_rows(engine, table_name):
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text(f"SELECT COUNT(*) FROM {table_name}")).scalar()
+    except Exception:
+        return 0
+
+def database_bytes(engine):
+    with engine.connect() as conn:
+        if engine.dialect.name == 'sqlite':
+            pages = conn.execute(text("PRAGMA page_count")).scalar()
+            free = conn.execute(text("PRAGMA freelist_count")).scalar()
+            size = conn.execute(text("PRAGMA page_size")).scalar()
+            return (pages - free) * size
+        # Reserved pages of the two history tables, 8 KB each
+        return conn.execute(text(
+            "SELECT SUM(reserved_page_count) * 8192 FROM sys.dm_db_partition_stats "
+            "WHERE object_id IN (OBJECT_ID('MarketData'), OBJECT_ID('Options_Data'))"
+        )).scalar() or 0
+
+def time_dashboard_queries(engine, repeat=3):
+    """Best-of-N time of the queries the dashboard runs on every rerun."""
+    timings = {}
+    with engine.connect() as conn:
+        asset_type = conn.execute(text("SELECT MIN(Asset_Type) FROM MarketData")).scalar()
+        underlying = conn.execute(text("SELECT MIN(Underlying_Ticker) FROM Options_Data")).scalar() \
+            if table_rows(engine, 'Options_Data') else None
+
+    queries = {'market': (text("SELECT * FROM MarketData WHERE Asset_Type = :v ORDER BY Date ASC"), asset_type)}
+    if underlying is not None:
+        queries['options'] = (text("SELECT * FROM Options_Data WHERE Underlying_Ticker = :v ORDER BY Last_Updated ASC"), underlying)
+
+    for name, (query, value) in queries.items():
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            with engine.connect() as conn:
+                pd.read_sql(query, conn, params={'v': value})
+            best = min(best, time.perf_counter() - started)
+        timings[name] = best
+    return timings
+
+# ==========================================
+# 3. MAINTENANCE STEPS
+# ==========================================
+
+def distinct_values(engine, column, table_name):
+    with engine.connect() as conn:
+        return [row[0] for row in conn.execute(text(f"SELECT DISTINCT {column} FROM {table_name}"))]
+
+def dedupe_market(engine, pause):
+    """Keep only the newest load (max Last_Updated) of every (Ticker, Date) bar."""
+    removed = 0
+    for ticker in distinct_values(engine, 'Ticker', 'MarketData'):
+        with engine.begin() as conn:
+            # Raw driver values are bound back as-is, so equality matches the stored format
+            keep = conn.execute(text(
+                "SELECT Date, MAX(Last_Updated) FROM MarketData WHERE Ticker = :t "
+                "GROUP BY Date HAVING COUNT(*) > 1"
+            ), {'t': ticker}).fetchall()
+            if keep:
+                # Counted, not taken from rowcount: executemany rowcounts are -1 on pyodbc
+                count = text("SELECT COUNT(*) FROM MarketData WHERE Ticker = :t")
+                before = conn.execute(count, {'t': ticker}).scalar()
+                conn.execute(text(
+                    "DELETE FROM MarketData WHERE Ticker = :t AND Date = :d AND Last_Updated < :keep"
+                ), [{'t': ticker, 'd': d, 'keep': newest} for d, newest in keep])
+                removed += before - conn.execute(count, {'t': ticker}).scalar()
+        time.sleep(pause)
+    return removed
+
+def compact_market(engine, older_than, rule, pause):
+    """Replace bars older than the cutoff with `rule` rollups, one ticker per transaction."""
+    removed = 0
+    for ticker in distinct_values(engine, 'Ticker', 'MarketData'):
+        with engine.begin() as conn:
+            bars = pd.read_sql(text("SELECT * FROM MarketData WHERE Ticker = :t AND Date < :cutoff"),
+                               conn, params={'t': ticker, 'cutoff': older_than})
+            if bars.empty:
+                continue
+            rolled = resample_ohlc(bars, rule)
+            if len(rolled) >= len(bars):
+                # Already at (or coarser than) the rollup resolution
+                continue
+            rolled = rolled[[c for c in bars.columns if c in rolled.columns]]
+            conn.execute(text("DELETE FROM MarketData WHERE Ticker = :t AND Date < :cutoff"),
+                         {'t': ticker, 'cutoff': older_than})
+            rolled.to_sql('MarketData', conn, if_exists='append', index=False)
+            removed += len(bars) - len(rolled)
+        time.sleep(pause)
+    return removed
+
+def prune_options(engine, older_than, sample, pause):
+    """Keep the last snapshot of each contract per `sample` bucket for snapshots older than the cutoff."""
+    removed = 0
+    for underlying in distinct_values(engine, 'Underlying_Ticker', 'Options_Data'):
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT Contract_Symbol, Last_Updated FROM Options_Data "
+                "WHERE Underlying_Ticker = :u AND Last_Updated < :cutoff"
+            ), {'u': underlying, 'cutoff': older_than}).fetchall()
+            if not rows:
+                continue
+
+            snaps = pd.DataFrame(rows, columns=['Contract_Symbol', 'Raw_Updated'])
+            snaps['Updated'] = pd.to_datetime(snaps['Raw_Updated'])
+            snaps['Bucket'] = snaps['Updated'].dt.floor(sample)
+            newest = snaps.groupby(['Contract_Symbol', 'Bucket'])['Updated'].transform('max')
+            drop = snaps[snaps['Updated'] < newest]
+            if not drop.empty:
+                conn.execute(text(
+                    "DELETE FROM Options_Data WHERE Underlying_Ticker = :u AND Contract_Symbol = :c AND Last_Updated = :lu"
+                ), [{'u': underlying, 'c': c, 'lu': lu} for c, lu in zip(drop['Contract_Symbol'], drop['Raw_Updated'])])
+                removed += len(drop)
+        time.sleep(pause)
+    return removed
+
+def optimize(engine, vacuum=False):
+    # Statistics refresh and index maintenance must run outside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if engine.dialect.name == 'sqlite':
+            conn.execute(text("ANALYZE"))
+            conn.execute(text("PRAGMA optimize"))
+            if vacuum:
+                # Rewrites the whole file under an exclusive lock: the dashboards and the ETL wait until it finishes
+                conn.execute(text("VACUUM"))
+        else:
+            insp = inspect(engine)
+            for table_name in ('MarketData', 'Options_Data'):
+                if not insp.has_table(table_name):
+                    continue
+                # REORGANIZE is always online, unlike REBUILD on non-Enterprise editions
+                conn.execute(text(f"ALTER INDEX ALL ON {table_name} REORGANIZE"))
+                conn.execute(text(f"UPDATE STATISTICS {table_name}"))
+
+# ==========================================
+# 4. MAIN
+# ==========================================
+
+def run(engine, args):
+    ensure_index(engine, 'MarketData', 'IX_MarketData_Ticker_Date', ['Ticker', 'Date'])
+    ensure_index(engine, 'Options_Data', 'IX_Options_Data_Underlying_Contract_Updated',
+                 ['Underlying_Ticker', 'Contract_Symbol', 'Last_Updated'])
+
+    before = {
+        'market_rows': table_rows(engine, 'MarketData'),
+        'option_rows': table_rows(engine, 'Options_Data'),
+        'bytes': database_bytes(engine),
+        'timings': time_dashboard_queries(engine),
+    }
+    now = datetime.now().replace(microsecond=0)
+
+    print("Removing duplicate bars...")
+    deduped = dedupe_market(engine, args.pause)
+    print(f"  > {deduped:,} duplicate rows removed")
+
+    if args.compact_after_days is not None:
+        print(f"Compacting bars older than {args.compact_after_days} days into {args.rollup} rollups...")
+        compacted = compact_market(engine, now - timedelta(days=args.compact_after_days), args.rollup, args.pause)
+        print(f"  > {compacted:,} rows folded into rollups")
+
+    if args.prune_after_days is not None and table_rows(engine, 'Options_Data'):
+        print(f"Thinning option snapshots older than {args.prune_after_days} days to one per {args.sample}...")
+        pruned = prune_options(engine, now - timedelta(days=args.prune_after_days), args.sample, args.pause)
+        print(f"  > {pruned:,} option snapshots removed")
+
+    print("Refreshing statistics" + (" and vacuuming..." if args.vacuum else "..."))
+    optimize(engine, vacuum=args.vacuum)
+
+    after = {
+        'market_rows': table_rows(engine, 'MarketData'),
+        'option_rows': table_rows(engine, 'Options_Data'),
+        'bytes': database_bytes(engine),
+        'timings': time_dashboard_queries(engine),
+    }
+
+    print("\n--- Maintenance Report ---")
+    print(f"MarketData rows:   {before['market_rows']:>12,} -> {after['market_rows']:,}")
+    print(f"Options_Data rows: {before['option_rows']:>12,} -> {after['option_rows']:,}")
+    print(f"Space in use:      {before['bytes'] / 2**20:>11.1f}M -> {after['bytes'] / 2**20:.1f}M "
+          f"({(before['bytes'] - after['bytes']) / 2**20:.1f}M reclaimed)")
+    for name, seconds in before['timings'].items():
+        new = after['timings'].get(name, seconds)
+        speedup = seconds / new if new else float('inf')
+        print(f"Dashboard {name} query: {seconds * 1000:>8.1f}ms -> {new * 1000:.1f}ms ({speedup:.1f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deduplicate, compact and optimize the history tables")
+    parser.add_argument('--db-url', help="SQLAlchemy URL instead of the configured SQL Server (e.g. sqlite:///MarketData.db)")
+    parser.add_argument('--compact-after-days', type=float, default=None,
+                        help="Roll up bars older than this many days (default: no compaction)")
+    parser.add_argument('--rollup', default='1h', help="Rollup bucket for compacted bars (pandas offset, default 1h)")
+    parser.add_argument('--prune-after-days', type=float, default=None,
+                        help="Thin option snapshots older than this many days (default: no pruning)")
+    parser.add_argument('--sample', default='1D', help="Keep one option snapshot per contract per this interval")
+    parser.add_argument('--vacuum', action='store_true',
+                        help="SQLite only: VACUUM to return freed pages to the OS (blocks readers and writers while it runs)")
+    parser.add_argument('--pause', type=float, default=0.05, help="Seconds to yield between per-ticker transactions")
+    args = parser.parse_args()
+
+    try:
+        run(connect(args.db_url), args)
+    except Exception as e:
+        print(f"Maintenance Failure: {e}")
@@ -0,0 +1,162 @@
+from datetime import time as clock_time, timedelta
+
+import pandas as pd
+
+# ==========================================
+# TRADING SESSIONS PER ASSET CLASS / EXCHANGE
+# ==========================================
+# Exchange holidays are not modelled: on a holiday the fetch simply comes
+# back empty, which the request scheduler already handles.
+
+class Session:
+    """A daily session in the exchange's local time on the given weekdays (Mon=0)."""
+
+    def __init__(self, name, tz, opens, closes, days=(0, 1, 2, 3, 4)):
+        self.name = name
+        self.tz = tz
+        self.opens = clock_time(*opens)
+        self.closes = clock_time(*closes)
+        self.days = days
+
+    def is_open(self, now):
+        local = now.tz_convert(self.tz)
+        return local.weekday() in self.days and self.opens <= local.time() < self.closes
+
+    def last_close(self, now):
+        """The most recent session close at or before `now`."""
+        local = now.tz_convert(self.tz)
+        for days_back in range(8):
+            day = (local - pd.Timedelta(days=days_back)).normalize()
+            if day.weekday() not in self.days:
+                continue
+            close = day.replace(hour=self.closes.hour, minute=self.closes.minute)
+            if close <= local:
+                return close
+        return None
+
+class AlwaysOpen:
+    name = 'Crypto 24/7'
+
+    def is_open(self, now):
+        return True
+
+    def last_close(self, now):
+        return None
+
+class WeeklySession:
+    """Continuous trading from Sunday 17:00 to Friday 17:00 New York (spot FX)."""
+    name = 'FX 24/5'
+    tz = 'America/New_York'
+
+    def is_open(self, now):
+        local = now.tz_convert(self.tz)
+        weekday, hour = local.weekday(), local.hour
+        if weekday == 5:
+            return False
+        if weekday == 6:
+            return hour >= 17
+        if weekday == 4:
+            return hour < 17
+        return True
+
+    def last_close(self, now):
+        local = now.tz_convert(self.tz)
+        friday = (local - pd.Timedelta(days=(local.weekday() - 4) % 7)).normalize().replace(hour=17)
+        return friday if friday <= local else friday - pd.Timedelta(weeks=1)
+
+NYSE = Session('NYSE', 'America/New_York', (9, 30), (16, 0))
+LSE = Session('LSE', 'Europe/London', (8, 0), (16, 30))
+XETRA = Session('Xetra', 'Europe/Berlin', (9, 0), (17, 30))
+EURONEXT = Session('Euronext Paris', 'Europe/Paris', (9, 0), (17, 30))
+TSE = Session('Tokyo', 'Asia/Tokyo', (9, 0), (15, 30))
+HKEX = Session('HKEX', 'Asia/Hong_Kong', (9, 30), (16, 0))
+SSE = Session('Shanghai', 'Asia/Shanghai', (9, 30), (15, 0))
+B3 = Session('B3', 'America/Sao_Paulo', (10, 0), (18, 0))
+ASX = Session('ASX', 'Australia/Sydney', (10, 0), (16, 0))
+KRX = Session('KRX', 'Asia/Seoul', (9, 0), (15, 30))
+TWSE = Session('TWSE', 'Asia/Taipei', (9, 0), (13, 30))
+TSX = Session('TSX', 'America/Toronto', (9, 30), (16, 0))
+CRYPTO = AlwaysOpen()
+FX = WeeklySession()
+
+INDEX_SESSIONS = {
+    '^GSPC': NYSE, '^DJI': NYSE, '^IXIC': NYSE, '^RUT': NYSE,
+    '^FTSE': LSE, '^N225': TSE, '^GDAXI': XETRA, '^FCHI': EURONEXT,
+    '^HSI': HKEX, '000001.SS': SSE, '^BVSP': B3, '^AXJO': ASX,
+    '^STOXX50E': XETRA, '^KS11': KRX, '^TWII': TWSE,
+}
+
+# Yahoo exchange suffixes, for watchlists beyond the built-in symbols
+SUFFIX_SESSIONS = {
+    '.L': LSE, '.DE': XETRA, '.F': XETRA, '.PA': EURONEXT, '.T': TSE, '.HK': HKEX,
+    '.SS': SSE, '.SZ': SSE, '.SA': B3, '.AX': ASX, '.KS': KRX, '.TW': TWSE, '.TO': TSX,
+}
+
+CATEGORY_SESSIONS = {
+    'Stocks': NYSE,
+    'Treasury': NYSE,
+    'Indices': NYSE,
+    'Crypto': CRYPTO,
+    'Currencies': FX,
+}
+
+def session_for(category, ticker):
+    if ticker in INDEX_SESSIONS:
+        return INDEX_SESSIONS[ticker]
+    if ticker.endswith('-USD'):
+        return CRYPTO
+    if ticker.endswith('=X'):
+        return FX
+    for suffix, session in SUFFIX_SESSIONS.items():
+        if ticker.endswith(suffix):
+            return session
+    return CATEGORY_SESSIONS.get(category, CRYPTO)
+
+class MarketHoursFilter:
+    """Drops tickers whose market is closed, plus one catch-up fetch after each close.
+
+    The catch-up runs once per session close, no earlier than `settle` after the
+    bell (Yahoo's intraday bars arrive delayed) and no later than `window`, so the
+    last bars of the day are stored without polling a closed market all night.
+    """
+
+    def __init__(self, settle=timedelta(minutes=15), window=timedelta(minutes=90)):
+        self.settle = settle
+        self.window = window
+        self.caught_up = {}
+
+    def active_assets(self, asset_dict, now=None):
+        now = pd.Timestamp.now(tz='UTC') if now is None else now
+        active = {}
+        catching_up = {}
+        skipped = 0
+
+        for category, tickers in asset_dict.items():
+            keep = []
+            for ticker in tickers:
+                session = session_for(category, ticker)
+                if session.is_open(now) or self._due_catch_up(session, now, catching_up):
+                    keep.append(ticker)
+                else:
+                    skipped += 1
+            if keep:
+                active[category] = keep
+
+        self.caught_up.update(catching_up)
+        if catching_up:
+            print(f"Post-close catch-up for: {', '.join(sorted(catching_up))}")
+        if skipped:
+            print(f"Skipping {skipped} tickers in closed markets")
+        return active
+
+    def _due_catch_up(self, session, now, catching_up):
+        last_close = session.last_close(now)
+        if last_close is None:
+            return False
+        since_close = now - last_close
+        if not self.settle <= since_close <= self.window:
+            return False
+        if self.caught_up.get(session.name) == last_close:
+            return False
+        catching_up[session.name] = last_close
+        return True
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+
+# ==========================================
+# DATA CHANGE NOTIFICATIONS (ETL -> DASHBOARDS)
+# ==========================================
+# The ETL workers bump a version counter per channel after each successful load;
+# dashboards poll the tiny Data_Versions table and only rerun when a channel they
+# display has moved. Works on SQL Server and SQLite, and across machines.
+#
+# Channels:
+#   'market'              any price load          'options'               any options load
+#   'market:<Asset_Type>' one asset class         'options:<Underlying>'  one underlying
+
+VERSIONS_TABLE = 'Data_Versions'
+
+def market_channels(asset_types):
+    return ['market'] + [f"market:{a}" for a in asset_types]
+
+def options_channels(underlyings):
+    return ['options'] + [f"options:{u}" for u in underlyings]
+
+def ensure_versions_table(engine):
+    if inspect(engine).has_table(VERSIONS_TABLE):
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE TABLE {VERSIONS_TABLE} ("
+                "Channel VARCHAR(200) NOT NULL PRIMARY KEY, Version BIGINT NOT NULL, Updated DATETIME NOT NULL)"
+            ))
+    except Exception:
+        # Another worker created it first
+        if not inspect(engine).has_table(VERSIONS_TABLE):
+            raise
+
+def _bump(engine, channel, now):
+    params = {'channel': channel, 'now': now}
+    update = text(f"UPDATE {VERSIONS_TABLE} SET Version = Version + 1, Updated = :now WHERE Channel = :channel")
+    with engine.begin() as conn:
+        if conn.execute(update, params).rowcount:
+            return
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"INSERT INTO {VERSIONS_TABLE} (Channel, Version, Updated) VALUES (:channel, 1, :now)"
+            ), params)
+    except IntegrityError:
+        # Another worker created the channel in between: bump the row it inserted
+        with engine.begin() as conn:
+            conn.execute(update, params)
+
+def publish(engine, channels):
+    """Bump the version of each channel, after the data is committed.
+
+    One short transaction per channel, so a new channel racing between shard
+    workers cannot roll back the bumps of the others.
+    """
+    try:
+        ensure_versions_table(engine)
+        now = datetime.now().replace(microsecond=0)
+        for channel in channels:
+            _bump(engine, channel, now)
+    except Exception as e:
+        # Dashboards still pick the data up on their next rerun
+        print(f"Notification Error: {e}")
+
+def current_versions(engine):
+    """{channel: version} for every channel; empty if nothing has been published yet."""
+    try:
+        with engine.connect() as conn:
+            return dict(conn.execute(text(f"SELECT Channel, Version FROM {VERSIONS_TABLE}")).fetchall())
+    except Exception:
+        return {}
@@ -0,0 +1,145 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+# ==========================================
+# RERUN PROFILER (opt-in)
+# ==========================================
+# Times named stages of one dashboard rerun, with row counts and Python memory
+# (tracemalloc), and can dump a cProfile of the whole rerun. Disabled profilers
+# cost one no-op context manager per stage.
+
+PROFILE_ENV = 'MARKET_MONITOR_PROFILE'
+PROFILE_DIR = os.environ.get(
+    'MARKET_MONITOR_PROFILE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'),
+)
+
+# tracemalloc.reset_peak() is Python 3.9+; on 3.8 per-stage peaks are not reported
+CAN_RESET_PEAK = hasattr(tracemalloc, 'reset_peak')
+
+# tracemalloc is process-wide and Streamlit runs sessions as threads of one process:
+# tracing is reference-counted across profilers, and memory is only reported for
+# stages that ran while no other profiled rerun was active (their allocations and
+# peak resets would otherwise mix into the numbers).
+_trace_lock = threading.Lock()
+_trace_users = 0
+_trace_owned = False
+_trace_generation = 0  # bumped per profiler, so a stage notices one that came and went
+
+def _acquire_tracing():
+    global _trace_users, _trace_owned, _trace_generation
+    with _trace_lock:
+        _trace_generation += 1
+        if _trace_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _trace_owned = True
+        _trace_users += 1
+
+def _release_tracing():
+    global _trace_users, _trace_owned
+    with _trace_lock:
+        _trace_users -= 1
+        if _trace_users == 0 and _trace_owned:
+            tracemalloc.stop()
+            _trace_owned = False
+
+def _tracing_alone():
+    """The current profiler generation if only one profiler is tracing, else None."""
+    with _trace_lock:
+        return _trace_generation if _trace_users == 1 else None
+
+def enabled_by_env():
+    return os.environ.get(PROFILE_ENV, '').lower() in ('1', 'true', 'yes', 'on')
+
+class Stage:
+    """Handle yielded by RerunProfiler.stage(); set `rows` to record how much data the stage handled."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+
+class RerunProfiler:
+    def __init__(self, enabled=False, trace_memory=True, cprofile=False):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.records = []
+        self.started = time.perf_counter()
+        self.profile = cProfile.Profile() if enabled and cprofile else None
+        self.closed = False
+
+        if self.trace_memory:
+            _acquire_tracing()
+        if self.profile is not None:
+            try:
+                self.profile.enable()
+            except ValueError:
+                # Another session's rerun is already being profiled (one profiler per process)
+                self.profile = None
+
+    @contextmanager
+    def stage(self, name):
+        handle = Stage(name)
+        if not self.enabled:
+            yield handle
+            return
+
+        generation = _tracing_alone() if self.trace_memory else None
+        if generation is not None:
+            start_mem = tracemalloc.get_traced_memory()[0]
+            if CAN_RESET_PEAK:
+                tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield handle
+        finally:
+            record = {'Stage': name, 'Seconds': time.perf_counter() - started, 'Rows': handle.rows}
+            # Left empty if another session started profiling meanwhile
+            if generation is not None and _tracing_alone() == generation:
+                current, peak = tracemalloc.get_traced_memory()
+                record['Allocated_MB'] = (current - start_mem) / 2**20
+                record['Peak_MB'] = (peak - start_mem) / 2**20 if CAN_RESET_PEAK else None
+            self.records.append(record)
+
+    def close(self):
+        """Stop tracing without reporting (e.g. the rerun was interrupted). Safe to call twice."""
+        if self.closed:
+            return
+        self.closed = True
+        if self.profile is not None:
+            self.profile.disable()
+        if self.trace_memory:
+            _release_tracing()
+
+    def finish(self):
+        """Stop tracing; returns (per-stage breakdown plus an 'other' row for untimed work, total seconds)."""
+        total = time.perf_counter() - self.started
+        self.close()
+
+        breakdown = pd.DataFrame(self.records, columns=['Stage', 'Seconds', 'Rows', 'Allocated_MB', 'Peak_MB'])
+        other = total - breakdown['Seconds'].sum()
+        breakdown.loc[len(breakdown)] = {'Stage': 'other (widgets, untimed code)', 'Seconds': max(other, 0.0)}
+        breakdown['Share'] = breakdown['Seconds'] / total if total > 0 else 0.0
+        return breakdown, total
+
+    def dump(self, label, directory=PROFILE_DIR):
+        """Write <directory>/<time>-<label>.prof (pstats / snakeviz) and a .txt top-40 by cumulative time."""
+        if self.profile is None:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{datetime.now():%Y%m%d-%H%M%S}-{label.lower().replace(' ', '_')}")
+        self.profile.dump_stats(base + '.prof')
+
+        text = io.StringIO()
+        pstats.Stats(self.profile, stream=text).sort_stats('cumulative').print_stats(40)
+        with open(base + '.txt', 'w') as f:
+            f.write(text.getvalue())
+        return base + '.prof'
@@ -0,0 +1,202 @@
+import json
+import os
+import time
+from collections import namedtuple
+
+import pandas as pd
+import yfinance as yf
+
+from scheduler import yfinance_transport
+
+# ==========================================
+# RECORD / REPLAY DATA SOURCES
+# ==========================================
+# RecordingSource wraps the live yfinance calls and saves every raw response as a
+# gzip pickle plus a line in manifest.jsonl. ReplaySource serves those responses
+# back through the same fetch_and_load / fetch_options code paths, without network,
+# sleeping the recorded call latency divided by `speed` (speed=100 -> 100x real time).
+
+MANIFEST = 'manifest.jsonl'
+
+OptionChain = namedtuple('OptionChain', ['calls', 'puts'])
+
+def _download_key(tickers):
+    tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+    return ','.join(tickers)
+
+class RecordingSource:
+    def __init__(self, directory, downloader=yfinance_transport, ticker_factory=yf.Ticker):
+        self.directory = directory
+        self.downloader = downloader
+        self.ticker_factory = ticker_factory
+        os.makedirs(directory, exist_ok=True)
+        # Continue numbering when appending to an existing capture
+        self.seq = 0
+        if os.path.exists(self._manifest_path()):
+            with open(self._manifest_path()) as f:
+                self.seq = sum(1 for line in f if line.strip())
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, MANIFEST)
+
+    def _save(self, kind, key, payload, elapsed):
+        file_name = f"{self.seq:06d}_{kind}.pkl.gz"
+        pd.to_pickle(payload, os.path.join(self.directory, file_name), compression='gzip')
+        entry = {'seq': self.seq, 'kind': kind, 'key': key, 'file': file_name,
+                 'recorded_at': time.time(), 'elapsed': elapsed}
+        with open(self._manifest_path(), 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+        self.seq += 1
+
+    def download(self, tickers, **kwargs):
+        started = time.perf_counter()
+        raw_data = self.downloader(tickers, **kwargs)
+        self._save('download', _download_key(tickers), raw_data, time.perf_counter() - started)
+        return raw_data
+
+    def ticker(self, symbol):
+        return _RecordingTicker(self, symbol)
+
+class _RecordingTicker:
+    def __init__(self, source, symbol):
+        self.source = source
+        self.symbol = symbol
+        self.tk = source.ticker_factory(symbol)
+
+    @property
+    def options(self):
+        started = time.perf_counter()
+        expirations = tuple(self.tk.options)
+        self.source._save('options', self.symbol, expirations, time.perf_counter() - started)
+        return expirations
+
+    def option_chain(self, date):
+        started = time.perf_counter()
+        chain = self.tk.option_chain(date)
+        # yfinance's chain namedtuple is not picklable; keep the two frames we use
+        payload = {'calls': chain.calls, 'puts': chain.puts}
+        self.source._save('option_chain', f"{self.symbol}|{date}", payload, time.perf_counter() - started)
+        return chain
+
+class ReplaySource:
+    """Serve recorded responses in recorded order, per (kind, key).
+
+    With loop=True a key whose recordings are exhausted starts again from its
+    first recording, so a short capture can drive an endless stress run.
+    """
+
+    def __init__(self, directory, speed=100.0, loop=True):
+        self.directory = directory
+        self.speed = speed
+        self.loop = loop
+        self.recordings = {}
+        self.cursors = {}
+        self._by_ticker = None
+        self._payloads = {}
+        with open(os.path.join(directory, MANIFEST)) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.recordings.setdefault((entry['kind'], entry['key']), []).append(entry)
+
+    def _next(self, kind, key):
+        entries = self.recordings.get((kind, key))
+        if not entries:
+            raise LookupError(f"No recording for {kind} {key!r} in {self.directory}")
+        cursor = self.cursors.get((kind, key), 0)
+        if cursor >= len(entries):
+            if not self.loop:
+                raise LookupError(f"Recordings for {kind} {key!r} exhausted")
+            cursor = 0
+        self.cursors[(kind, key)] = cursor + 1
+
+        entry = entries[cursor]
+        if self.speed:
+            time.sleep(entry['elapsed'] / self.speed)
+        return pd.read_pickle(os.path.join(self.directory, entry['file']), compression='gzip')
+
+    def download(self, tickers, **kwargs):
+        key = _download_key(tickers)
+        if ('download', key) in self.recordings:
+            return self._next('download', key)
+        # The batches differ from the capture (the scheduler's batch size moved):
+        # stitch the answer together from the recordings that contain each ticker
+        return self._stitch([tickers] if isinstance(tickers, str) else list(tickers))
+
+    def _stitch(self, tickers):
+        frames = {}
+        for ticker in tickers:
+            entries = self._ticker_recordings().get(ticker)
+            if not entries:
+                continue
+            cursor = self.cursors.get(('ticker', ticker), 0) % len(entries)
+            self.cursors[('ticker', ticker)] = cursor + 1
+            raw_data = self._payload(entries[cursor]['file'])
+            frames[ticker] = raw_data[ticker] if getattr(raw_data.columns, 'nlevels', 1) > 1 else raw_data
+        if not frames:
+            return pd.DataFrame()
+        if len(tickers) == 1:
+            return next(iter(frames.values()))
+        return pd.concat(frames, axis=1)
+
+    def _ticker_recordings(self):
+        if self._by_ticker is None:
+            self._by_ticker = {}
+            for (kind, key), entries in self.recordings.items():
+                if kind == 'download':
+                    for ticker in key.split(','):
+                        self._by_ticker.setdefault(ticker, []).extend(entries)
+            for entries in self._by_ticker.values():
+                entries.sort(key=lambda entry: entry['seq'])
+        return self._by_ticker
+
+    def _payload(self, file_name):
+        # Stitching reads the same capture file once per ticker; keep recent ones decoded
+        if file_name not in self._payloads:
+            if len(self._payloads) >= 16:
+                self._payloads.pop(next(iter(self._payloads)))
+            self._payloads[file_name] = pd.read_pickle(os.path.join(self.directory, file_name), compression='gzip')
+        return self._payloads[file_name]
+
+    def ticker(self, symbol):
+        return _ReplayTicker(self, symbol)
+
+    def scale(self, seconds):
+        """Scale a wall-clock interval (e.g. the ETL sleep) by the replay speed."""
+        return seconds / self.speed if self.speed else 0
+
+class _ReplayTicker:
+    def __init__(self, source, symbol):
+        self.source = source
+        self.symbol = symbol
+
+    @property
+    def options(self):
+        return self.source._next('options', self.symbol)
+
+    def option_chain(self, date):
+        payload = self.source._next('option_chain', f"{self.symbol}|{date}")
+        return OptionChain(calls=payload['calls'], puts=payload['puts'])
+
+# ==========================================
+# COMMAND LINE WIRING (shared by etl.py / etl2.py)
+# ==========================================
+
+def add_source_arguments(parser):
+    parser.add_argument('--record', metavar='DIR', help="Capture raw yfinance responses to DIR")
+    parser.add_argument('--replay', metavar='DIR', help="Serve recorded responses from DIR instead of yfinance")
+    parser.add_argument('--speed', type=float, default=100.0,
+                        help="Replay speed multiplier for call latency and the sleep interval (0 = no waiting)")
+
+def source_from_args(args):
+    """Return (source, sleep_scale) where source has .download and .ticker, or (None, 1.0) for live."""
+    if args.record and args.replay:
+        raise SystemExit("--record and --replay are mutually exclusive")
+    if args.record:
+        print(f"Recording raw responses to {args.record}")
+        return RecordingSource(args.record), 1.0
+    if args.replay:
+        source = ReplaySource(args.replay, speed=args.speed)
+        print(f"Replaying {args.replay} at {args.speed:g}x")
+        return source, source.scale(1.0)
+    return None, 1.0
@@ -0,0 +1,198 @@
+import time
+from collections import deque
+
+import yfinance as yf
+
+# ==========================================
+# RATE-LIMIT-AWARE REQUEST SCHEDULER
+# ==========================================
+# Bulk downloads go through a pluggable transport: any callable with the
+# yf.download signature that raises RateLimitError when throttled. The
+# scheduler paces calls with a token bucket (slowed down after a 429), grows
+# batches while calls are fast and shrinks them on errors or slow responses, re-queues tickers that
+# came back empty and gives up on a ticker after `max_retries` attempts
+# (it then lands in the dead-letter dict with the last reason). Empty
+# responses get fewer retries: they are usually a closed or delisted market.
+
+DEFAULT_RATE = 2.0  # requests per second across the whole ETL
+
+class RateLimitError(Exception):
+    def __init__(self, message="Rate limited", retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def yfinance_transport(tickers, **kwargs):
+    """yf.download, but with throttling surfaced as RateLimitError."""
+    try:
+        raw_data = yf.download(tickers, **kwargs)
+    except Exception as e:
+        if 'rate' in type(e).__name__.lower() or 'Too Many Requests' in str(e):
+            raise RateLimitError(str(e))
+        raise
+
+    # yfinance swallows per-ticker failures and only records them here
+    errors = getattr(getattr(yf, 'shared', None), '_ERRORS', None) or {}
+    if errors and all('Too Many Requests' in str(msg) or 'Rate limit' in str(msg) for msg in errors.values()):
+        raise RateLimitError(f"Throttled on {len(errors)} tickers")
+    return raw_data
+
+class TokenBucket:
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        self._refill()
+        while self.tokens < tokens:
+            self.sleep((tokens - self.tokens) / self.rate)
+            self._refill()
+        self.tokens -= tokens
+
+    def drain(self):
+        """Empty the bucket, e.g. after the server told us to back off."""
+        self._refill()
+        self.tokens = 0
+
+class AdaptiveBatcher:
+    """Additive increase while latency is under target, halve on errors or slow calls."""
+
+    def __init__(self, start=25, minimum=1, maximum=200, step=10, target_latency=5.0):
+        self.size = start
+        self.minimum = minimum
+        self.maximum = maximum
+        self.step = step
+        self.target_latency = target_latency
+
+    def record_success(self, latency):
+        if latency <= self.target_latency:
+            self.size = min(self.maximum, self.size + self.step)
+        else:
+            self.shrink()
+
+    def shrink(self):
+        self.size = max(self.minimum, self.size // 2)
+
+class RequestScheduler:
+    def __init__(self, transport=yfinance_transport, rate=DEFAULT_RATE, burst=4, start_batch=25, min_batch=1,
+                 max_batch=200, target_latency=5.0, max_retries=3, empty_retries=1, backoff=5.0, max_backoff=120.0,
+                 max_throttles=8, clock=time.monotonic, sleep=time.sleep):
+        self.transport = transport
+        # The bucket rate is halved on every 429 and creeps back up to `rate` on success
+        self.rate = rate
+        self.min_rate = rate / 16
+        self.max_throttles = max_throttles
+        self.bucket = TokenBucket(rate, burst, clock=clock, sleep=sleep)
+        self.batcher = AdaptiveBatcher(start=start_batch, minimum=min_batch, maximum=max_batch,
+                                       target_latency=target_latency)
+        self.max_retries = max_retries
+        self.empty_retries = empty_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.sleep = sleep
+        self.dead_letter = {}
+        self.stats = {'requests': 0, 'rate_limited': 0, 'errors': 0, 'retried': 0}
+
+    def fetch(self, tickers, **kwargs):
+        """Yield (batch_tickers, raw_data) for every batch that returned data.
+
+        raw_data has the same shape transform_batch expects for that batch:
+        ticker-grouped columns for several tickers, flat columns for one.
+        """
+        queue = deque(tickers)
+        attempts = {}
+        consecutive_throttles = 0
+
+        while queue:
+            batch = [queue.popleft() for _ in range(min(self.batcher.size, len(queue)))]
+            self.bucket.acquire()
+            self.stats['requests'] += 1
+            started = self.clock()
+
+            try:
+                raw_data = self.transport(batch, **kwargs)
+            except RateLimitError as e:
+                self.stats['rate_limited'] += 1
+                consecutive_throttles += 1
+                self.batcher.shrink()
+                self.bucket.drain()
+                self.bucket.rate = max(self.min_rate, self.bucket.rate / 2)
+                # Throttling is not the tickers' fault, so it does not use up their retries
+                queue.extendleft(reversed(batch))
+                if consecutive_throttles > self.max_throttles:
+                    for ticker in queue:
+                        self.dead_letter[ticker] = "rate limited"
+                    queue.clear()
+                    break
+                wait = e.retry_after or min(self.max_backoff, self.backoff * 2 ** (consecutive_throttles - 1))
+                print(f"Rate limited on a batch of {len(batch)}; backing off {wait:.1f}s")
+                self.sleep(wait)
+                continue
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.batcher.shrink()
+                self._requeue(queue, batch, attempts, str(e))
+                continue
+
+            consecutive_throttles = 0
+            self.batcher.record_success(self.clock() - started)
+            self.bucket.rate = min(self.rate, self.bucket.rate + self.rate / 20)
+
+            present = _present_tickers(raw_data, batch)
+            missing = [t for t in batch if t not in present]
+            if missing:
+                self._requeue(queue, missing, attempts, "no rows returned", limit=self.empty_retries)
+            if present:
+                yield present, _select(raw_data, present, batch)
+
+    def _requeue(self, queue, tickers, attempts, reason, limit=None):
+        limit = self.max_retries if limit is None else limit
+        for ticker in tickers:
+            attempts[ticker] = attempts.get(ticker, 0) + 1
+            if attempts[ticker] > limit:
+                self.dead_letter[ticker] = reason
+            else:
+                self.stats['retried'] += 1
+                queue.append(ticker)
+
+    def drain_dead_letter(self):
+        """Return and clear the tickers that exhausted their retries."""
+        dead, self.dead_letter = self.dead_letter, {}
+        return dead
+
+def _is_grouped(raw_data):
+    return getattr(raw_data.columns, 'nlevels', 1) > 1
+
+def _present_tickers(raw_data, batch):
+    """The tickers in `batch` that came back with at least one Close."""
+    if raw_data is None or raw_data.empty:
+        return []
+    if not _is_grouped(raw_data):
+        has_close = len(batch) == 1 and 'Close' in raw_data.columns and raw_data['Close'].notna().any()
+        return list(batch) if has_close else []
+
+    # Check actual columns, not columns.levels: levels keep tickers that were dropped
+    available = set(raw_data.columns.get_level_values(0))
+    present = []
+    for ticker in batch:
+        if ticker in available and (ticker, 'Close') in raw_data.columns and raw_data[(ticker, 'Close')].notna().any():
+            present.append(ticker)
+    return present
+
+def _select(raw_data, present, batch):
+    if not _is_grouped(raw_data):
+        return raw_data
+    if len(present) == 1:
+        return raw_data[present[0]]
+    if len(present) == len(batch):
+        return raw_data
+    return raw_data[present]
@@ -0,0 +1,75 @@
+import argparse
+import hashlib
+import json
+import os
+import zlib
+
+import pandas as pd
+
+# ==========================================
+# WATCHLIST LOADING & SHARDING
+# ==========================================
+# The watchlist is a {category: [tickers]} dict, the same shape as `assets` in etl.py.
+# Sources, first match wins:
+#   1. JSON file at $MARKET_MONITOR_WATCHLIST (default: watchlist.json next to the scripts)
+#   2. A `Watchlist` table (Ticker, Asset_Type) in the ETL database
+#   3. The built-in default passed by the caller
+
+WATCHLIST_FILE = os.environ.get(
+    'MARKET_MONITOR_WATCHLIST',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'watchlist.json'),
+)
+
+def load_watchlist(default, engine=None, path=WATCHLIST_FILE):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            watchlist = json.load(f)
+        print(f"Watchlist: {sum(map(len, watchlist.values()))} tickers from {path}")
+        return watchlist
+
+    if engine is not None:
+        try:
+            df = pd.read_sql("SELECT Ticker, Asset_Type FROM Watchlist", engine)
+            if not df.empty:
+                watchlist = {category: group['Ticker'].tolist() for category, group in df.groupby('Asset_Type', sort=False)}
+                print(f"Watchlist: {len(df)} tickers from the Watchlist table")
+                return watchlist
+        except Exception:
+            # No Watchlist table in this database: fall back to the default
+            pass
+
+    return default
+
+def shard_of(ticker, shard_count):
+    """Stable shard number for a ticker (crc32, so it is identical across processes and runs)."""
+    return zlib.crc32(ticker.encode('utf-8')) % shard_count
+
+def worker_of(ticker, worker_count):
+    """Worker process for a ticker inside one daemon.
+
+    Uses a hash independent of shard_of: a daemon running --shard K/N only holds
+    tickers with crc32 % N == K, so splitting them on crc32 again would leave
+    whole workers empty.
+    """
+    return int(hashlib.md5(ticker.encode('utf-8')).hexdigest()[:8], 16) % worker_count
+
+def shard_assets(asset_dict, shard_index, shard_count, assign=shard_of):
+    """The part of the watchlist owned by one shard; empty categories are dropped."""
+    shard = {}
+    for category, tickers in asset_dict.items():
+        owned = [t for t in tickers if assign(t, shard_count) == shard_index]
+        if owned:
+            shard[category] = owned
+    return shard
+
+def parse_shard(value):
+    """Parse a 'K/N' command line value into (K, N) (an argparse type, so errors carry their message)."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Shard must look like K/N, got {value!r}")
+    if count < 1:
+        raise argparse.ArgumentTypeError(f"Shard count must be at least 1, got {count}")
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"Shard index must be in 0..{count - 1}, got {index}")
+    return index, count